@@ -1,14 +1,23 @@
-from taiga import TaigaAPI
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 import discord
 from discord import app_commands
 from discord.ext import commands
 import logging
 import asyncio
-import json
-import requests
+import time
+import re
+from concurrent.futures import ThreadPoolExecutor
 import output as ot
+from progress import ProgressReporter, send_long_message, split_message
+from taiga_client import TaigaClient
+from boards import BoardRegistry, DEFAULT_BOARD
+from strike_store import StrikeStore
+from resilience import TaigaDegraded
+from profiling import NullProfile, ProfileManager
+from rank_rules import load_rules
+from story_records import StoryRecord
+from quota_plan import match_rows, parse_report, plan_quota
 
 # 🧠 TAAOS (Taiga Automation Assistance Operative System)
 # 
@@ -37,6 +46,7 @@ import output as ot
 # The bot parses all rows, compiles them into a structured table, and iterates through each entry.
 # Using this data, it communicates with the Taiga API to update the relevant user stories on a designated Taiga board.
 # It locates cards matching each name and modifies various attributes based on the parsed quota and activity data.
+# All changes are planned from one snapshot of the board first, with dry_run the plan is shown and nothing is written.
 #
 # ---
 #
@@ -55,7 +65,6 @@ import output as ot
 # Load credentials from environment
 EMAIL = os.getenv("TAIGA_USERNAME") # Username, to be added in your env variables, or for a quick trial run simply replace it with EMAIL = "youremail@gmail.com"
 PASSWORD = os.getenv("TAIGA_PASSWORD") # Password, same things as the Email
-TAIGA_URL = "https://api.taiga.io/api/v1" #Constant, don't change, essential for JSON functions
 
 # Bot Configuration
 TOKEN = "TO REPLACE" # Discord bot token
@@ -73,53 +82,39 @@ ot.success("Step 1 complete - Gathering user credentials")
 if not EMAIL or not PASSWORD:
     raise ValueError(ot.error("Missing TAIGA_USERNAME or TAIGA_PASSWORD environment variables"))
 
-# Authenticate
-api = TaigaAPI()
-api.auth(
-    username=EMAIL,
-    password=PASSWORD
-)
+# Authenticate, one client (and one connection pool) is shared by every board
+client = TaigaClient(EMAIL, PASSWORD)
+api = client.api
 ot.success("Step 2 complete - User authenticated through the taiga API")
-# Set project and column (status)
-PROJECT_SLUG = "sevencuts-aegis-research-division-1" # this is the identifier of the taiga board, currently set to the main board (the bot won't just work in any board, the credentials you gave it must have access to the board you're trying to use)
-if PROJECT_SLUG == "tommy07475-test":
-    ot.warn("RUNNING BOT IN TEST BOARD")
-elif PROJECT_SLUG == "sevencuts-aegis-research-division-1":
-    ot.info("RUNNING BOT IN OFFICIAL ARD SERVER")
-TARGET_STATUS_NAME = "Researcher"
-SECOND_TARGET_STATUS_NAME = "Senior Researcher"
-THIRD_TARGET_STATUS_NAME = "Discharging Personnel"
-FOURTH_TARGET_STATUS_NAME = "Exempted Personnel"
-FIFTH_TARGET_STATUS_NAME = "Assistant Researcher"
-
-
-project = api.projects.get_by_slug(PROJECT_SLUG)
-story_statuses = project.list_user_story_statuses()
-ot.success("Step 3 complete - Successfully found the project")
-
-
-def get_target_status(TARGET_STATUS_VAR):
-    target_status = next((s for s in story_statuses if s.name == TARGET_STATUS_VAR), None)
-    if not target_status:
-        raise ValueError(ot.error(f"Status '{TARGET_STATUS_VAR}' not found in the project's story statuses."))
-    else:
-        return target_status
 
+# Boards (project, columns, statuses, custom attributes) are configured in boards.py and loaded on first use
+boards = BoardRegistry(client)
+boards.get(DEFAULT_BOARD)
+ot.success(f"Step 3 complete - Successfully loaded the default board ({DEFAULT_BOARD})")
+
+BOARD_CHOICES = [app_commands.Choice(name=key, value=key) for key in boards.keys()]
+
+# Admins can profile the next runs of a command with /profile
+profiler = ProfileManager()
+PROFILED_COMMANDS = ["parsequota", "promote", "promote_batch", "create_card"]
+
+# Local history of every parsequota outcome, used by /strikes
+strike_history = StrikeStore()
+ot.success(f"Step 4 complete - Loaded the activity strike history ({len(strike_history)} records)")
+
+# Rank ladder, strike levels and discharge rules, edit rank_rules.json to change them
+rules = load_rules()
+ot.success(f"Step 5 complete - Compiled the rank rules ({len(rules.ranks)} ranks, {len(rules.strike_levels)} strike levels)")
 
-cf_definitions = api.user_story_attributes.list(project=project.id)
-cf_id_to_name = {str(cf.id): cf.name for cf in cf_definitions}
 
-ot.success("Step 4 complete - Successfully found the target column and identified general custom attributes")
+def get_board(interaction, board=None):
+    key = board.value if isinstance(board, app_commands.Choice) else board
+    return boards.for_guild(interaction.guild_id, key)
 
-def get_stories_in_column(TARGET_STATUS_VAR):
-    stories_in_column = [
-        story for story in api.user_stories.list(project=project.id)
-        if story.status == get_target_status(TARGET_STATUS_VAR).id
-    ]
-    ot.info(f"Found {len(stories_in_column)} user stories in column '{TARGET_STATUS_VAR}'")
-    return stories_in_column
 
-ot.success("Step 5 complete! - Successfully retrieved the user stories in the target column")
+def run_in_read_scope(fn, *args):
+    with client.read_scope():
+        return fn(*args)
 
 def update_custom_field(user_story, cf_definitions, target_name, new_value_name):
     nooptions = False
@@ -160,258 +155,72 @@ def update_custom_field(user_story, cf_definitions, target_name, new_value_name)
                 ot.error(f"The value '{new_value_name}' does not match any valid options for '{cf.name}'.")
                 return False
 
-        latest_story = api.user_stories.get(user_story.id)
-        
         if get_custom_attribute_value(user_story, cf_definitions, "Activity") == "Inactivity Notice":
             ot.info("Skipping custom value update due to user being in Inactivity Notice.")
         else:
-            custom_field_id = str(cf.id)
-            latest_story.set_attribute(custom_field_id, new_value_name, 1)
+            # The attribute values have their own version, the latest one is sent back with the update
+            latest = get_story_attributes(user_story.id)
+            values = dict(latest.get("attributes_values") or {})
+            values[str(cf.id)] = new_value_name
+            response = client.patch(f"userstories/custom-attributes-values/{user_story.id}", {"attributes_values": values, "version": latest["version"]})
+            if response.status_code not in (200, 201):
+                ot.error(f"Failed to update custom field. Status: {response.status_code}, Body: {response.text}")
+                return False
 
-        verified = api.user_stories.get(user_story.id)
-        verified_values = verified.get_attributes().get("attributes_values", {})
+        verified_values = get_story_attributes(user_story.id).get("attributes_values", {})
         confirmed = verified_values.get(str(cf.id), "N/A")
 
         ot.info(f"Re-fetched story. Field '{cf.name}' is now: '{confirmed}'")
 
         return True if str(confirmed).lower() == str(new_value_name).lower() else False
 
+    except TaigaDegraded:
+        raise
     except Exception as e:
         ot.error(f"Exception occurred while updating custom field: {e}")
         return False
 
-def add_isolated_comment(story, comment):
+def add_isolated_status(board, story, status, expected_status=None):
     try:
+        og_status = board.get_status_from_id(story.status) #for print sillies
         # Fetch the latest version of the story
         latest = api.user_stories.get(story.id)
         version = latest.version
 
-        headers = {
-            "Authorization": f"Bearer {api.token}",
-            "Content-Type": "application/json"
-        }
-
-        data = {
-            "comment": comment,
-            "version": version
-        }
-
-        url = f"{TAIGA_URL}/userstories/{story.id}"
-
-        response = requests.patch(
-            url,
-            headers=headers,
-            data=json.dumps(data)
-        )
-
-        if response.status_code in (200, 201):
-            ot.success("Successfully added isolated comment.")
-            return True
-        else:
-            ot.error(f"Failed to add comment. Status: {response.status_code}, Body: {response.text}")
+        if expected_status is not None and latest.status != expected_status:
+            # Moved since we last looked (the /promote index can be a couple of minutes old)
+            ot.error(f"'{story.subject}' is in '{board.get_status_from_id(latest.status)}' now, not '{og_status}', status not changed.")
+            story.status = latest.status
             return False
 
-    except Exception as e:
-        ot.error(f"Exception occurred while posting isolated comment: {e}")
-        return False
-    
-def add_isolated_status(story, status):
-    try:
-        og_status = get_status_from_id(story.status) #for print sillies
-        # Fetch the latest version of the story
-        latest = api.user_stories.get(story.id)
-        version = latest.version
-
-        headers = {
-            "Authorization": f"Bearer {api.token}",
-            "Content-Type": "application/json"
-        }
-
         data = {
             "status": status,
             "version": version
         }
 
-        url = f"{TAIGA_URL}/userstories/{story.id}"
-
-        response = requests.patch(
-            url,
-            headers=headers,
-            data=json.dumps(data)
-        )
+        response = client.patch(f"userstories/{story.id}", data)
 
         if response.status_code in (200, 201):
-            updated_story = api.user_stories.get(story.id)
-            new_status = get_status_from_id(updated_story.status)
-            ot.success(f"Successfully changed status from: {og_status} to: {new_status}")
+            try:
+                updated_story = api.user_stories.get(story.id)
+                ot.success(f"Successfully changed status from: {og_status} to: {board.get_status_from_id(updated_story.status)}")
+            except TaigaDegraded:
+                raise
+            except Exception as e:
+                # The move itself went through, only the confirmation read failed
+                ot.warn(f"Changed status of '{story.subject}', but couldn't re-fetch it: {e}")
             return True
         else:
             ot.error(f"Failed to add status. Status: {response.status_code}, Body: {response.text}")
             return False
 
+    except TaigaDegraded:
+        raise
     except Exception as e:
         ot.error(f"Exception occurred while posting isolated status: {e}")
         return False
     
-def isolated_task_change(mode, story, task_name, reqinput):
-    try:
-        match mode:
-            case "ren":
-                task_id = get_task_id_by_name(story, task_name)
-                latest = api.tasks.get(task_id)
-                version = latest.version
-
-                headers = {
-                    "Authorization": f"Bearer {api.token}",
-                    "Content-Type": "application/json"
-                }
-
-                data = {
-                    "subject": reqinput,
-                    "version": version
-                }
-
-                url = f"{TAIGA_URL}/tasks/{task_id}"
-
-                response = requests.patch(
-                    url,
-                    headers=headers,
-                    data=json.dumps(data)
-                )
-
-                if response.status_code in (200, 201):
-                    ot.success(f"Successfully changed task subject.")
-                    return True
-                else:
-                    ot.error(f"Failed to change subject. Status: {response.status_code}, Body: {response.text}")
-                    return False
-            case "del":
-                task_id = get_task_id_by_name(story, task_name)
-
-                headers = {
-                    "Authorization": f"Bearer {api.token}",
-                    "Content-Type": "application/json"
-                }
-
-                data = {}
-
-                url = f"{TAIGA_URL}/tasks/{task_id}"
-
-                response = requests.delete(
-                    url,
-                    headers=headers,
-                    data=json.dumps(data)
-                )
-
-                if response.status_code in (200, 201):
-                    ot.success(f"Successfully deleted task.")
-                    return True
-                elif response.status_code in (204):
-                    ot.warn(f"Successfully deleted task, however server did not respond back, status code: {response.status_code}")
-                else:
-                    ot.error(f"Failed to delete task. Status: {response.status_code}, Body: {response.text}")
-                    return False
-            case "sta":
-                task_id = get_task_id_by_name(story, task_name)
-                latest = api.tasks.get(task_id)
-                version = latest.version
-
-                headers = {
-                    "Authorization": f"Bearer {api.token}",
-                    "Content-Type": "application/json"
-                }
-
-                data = {
-                    "status": get_task_status_id(reqinput),
-                    "version": version
-                }
-
-                url = f"{TAIGA_URL}/tasks/{task_id}"
-
-                response = requests.patch(
-                    url,
-                    headers=headers,
-                    data=json.dumps(data)
-                )
-
-                if response.status_code in (200, 201):
-                    ot.success(f"Successfully changed task status.")
-                    return True
-                else:
-                    ot.error(f"Failed to change task status. Status: {response.status_code}, Body: {response.text}")
-                    return False
-            case _:
-                ot.error("Invalid mode for isolated task function.")
-                return False
-    except Exception as e:
-        ot.error(f"Exception occurred while posting isolated status: {e}")
-        return False
-
-def get_task_id_by_name(story, task_name):
-    try:
-        tasks = api.tasks.list(project=project.id, user_story=story.id)
-
-        for task in tasks:
-            if task.subject and task.subject.lower() == task_name.lower():
-                return task.id
-
-        return None
-
-    except Exception as e:
-        print(f"[ FAIL ] Exception occurred while getting task ID: {e}")
-        return None
-
-def get_status_id(sname):
-    try:
-        story_statuses = project.list_user_story_statuses()
-        for s in story_statuses:
-            if s.name == sname:
-                return s.id
-        return None
-    except Exception as e:
-        ot.error(f"Execption occurred while getting status ID: {e}")
-        return None
-
-def get_status_from_id(sid):
-    try:
-        story_statuses = project.list_user_story_statuses()
-        for s in story_statuses:
-            if s.id == sid:
-                return s.name
-        return None
-    except Exception as e:
-        ot.error(f"Execption occurred while getting status ID: {e}")
-        return None
-
-def get_next_status_for_promo(status):
-    match status:
-        case "Assistant Researcher":
-            return "Researcher"
-        case "Researcher":
-            return "Senior Researcher"
-        case "Senior Researcher":
-            return "Instructor"
-        case "Instructor":
-            return "Supervisor"
-        case "Supervisor":
-            return "Overwatch"
-        case _:
-            ot.error("Invalid input for next status promo functions, defaulting to Assistant Reseacher column.")
-            return "Assistant Researcher"
-
-def get_task_status_id(sname):
-    try:
-        task_statuses = api.task_statuses.list(project=project.id)
-        for s in task_statuses:
-            if s.name == sname:
-                return s.id
-        return None
-    except Exception as e:
-        ot.error(f"Execption occurred while getting task status ID: {e}")
-        return None
-        
-
-def isolated_tag_change(mode, story, name):
+def isolated_tag_change(board, mode, story, name):
     match mode:
         case "add":
             try:
@@ -419,7 +228,7 @@ def isolated_tag_change(mode, story, name):
                 version = latest.version
                 existing_tags = latest.tags or []
 
-                project_info = api.projects.get(project.id)
+                project_info = api.projects.get(board.project.id)
                 project_tags = project_info.tags or []
                 color = ""
                 for t in project_tags:
@@ -434,23 +243,12 @@ def isolated_tag_change(mode, story, name):
                 new_tag = [name, color]
                 updated_tags = existing_tags + [new_tag]
 
-                headers = {
-                    "Authorization": f"Bearer {api.token}",
-                    "Content-Type": "application/json"
-                }
-
                 data = {
                     "tags": updated_tags,
                     "version": version
                 }
 
-                url = f"{TAIGA_URL}/userstories/{story.id}"
-
-                response = requests.patch(
-                    url,
-                    headers=headers,
-                    data=json.dumps(data)
-                )
+                response = client.patch(f"userstories/{story.id}", data)
 
                 if response.status_code in (200, 201):
                     ot.success(f"Successfully added isolated tag '{name}' (color: {color or 'default'}).")
@@ -459,6 +257,8 @@ def isolated_tag_change(mode, story, name):
                     ot.error(f"Failed to add tag. Status: {response.status_code}, Body: {response.text}")
                     return False
 
+            except TaigaDegraded:
+                raise
             except Exception as e:
                 ot.error(f"Exception occurred while posting isolated tag: {e}")
                 return False
@@ -474,23 +274,12 @@ def isolated_tag_change(mode, story, name):
                     ot.success(f"Tag '{name}' not present.")
                     return True
 
-                headers = {
-                    "Authorization": f"Bearer {api.token}",
-                    "Content-Type": "application/json"
-                }
-
                 data = {
                     "tags": updated_tags,
                     "version": version
                 }
 
-                url = f"{TAIGA_URL}/userstories/{story.id}"
-
-                response = requests.patch(
-                    url,
-                    headers=headers,
-                    data=json.dumps(data)
-                )
+                response = client.patch(f"userstories/{story.id}", data)
 
                 if response.status_code in (200, 201):
                     ot.success(f"Successfully removed isolated tag '{name}'.")
@@ -499,6 +288,8 @@ def isolated_tag_change(mode, story, name):
                     ot.error(f"Failed to remove tag. Status: {response.status_code}, Body: {response.text}")
                     return False
 
+            except TaigaDegraded:
+                raise
             except Exception as e:
                 ot.error(f"Exception occurred while removing isolated tag: {e}")
                 return False
@@ -506,6 +297,13 @@ def isolated_tag_change(mode, story, name):
             ot.error("Invalid mode for isolated tag function.")
             return False
 
+def get_story_attributes(story_id):
+    # Works for StoryRecords and python-taiga stories alike, repeated reads in a read scope hit Taiga once
+    response = client.get(f"userstories/custom-attributes-values/{story_id}")
+    if response.status_code != 200:
+        raise ValueError(f"Failed to get custom attributes. Status: {response.status_code}, Body: {response.text}")
+    return response.json()
+
 def get_custom_attribute_value(user_story, cf_definitions, target_name): 
     try:
         target_name = target_name.strip().lower()
@@ -516,96 +314,192 @@ def get_custom_attribute_value(user_story, cf_definitions, target_name):
             return None
 
         custom_field_id = str(cf.id)
-        current_values = user_story.get_attributes().get("attributes_values", {})
+        current_values = get_story_attributes(user_story.id).get("attributes_values", {})
 
         current_value = current_values.get(custom_field_id)
         return current_value
 
+    except TaigaDegraded:
+        raise
     except Exception as e:
         ot.error(f"Exception occurred while retrieving custom field value: {e}")
         return None
 
+MOVE_WORKERS = 4 # Cards whose tags and tasks are updated at the same time after a bulk move
+
+def project_tag_colors(board):
+    return {t[0].lower(): t[1] or "" for t in api.projects.get(board.project.id).tags or []}
+
+def bulk_move_stories(board, groups, finish):
+    # groups maps a status id to the stories going there, each group is moved with one bulk kanban request.
+    # The moves bump every card's version, so each target column is listed once afterwards for the new
+    # versions and tags, then finish(story, latest, tag_colors) runs for several cards at once and returns
+    # a list of what failed on the card.
+    # Returns story id -> failures, None for cards that couldn't be moved.
+    results = {}
+    moved = [] # (story, status id)
+    for status_id, stories in groups.items():
+        response = client.post("userstories/bulk_update_kanban_order", {
+            "project_id": board.project.id,
+            "status_id": status_id,
+            "bulk_userstories": [s.id for s in stories]
+        })
+        if response.status_code not in (200, 201):
+            ot.error(f"Failed to bulk move stories to '{board.get_status_from_id(status_id)}'. Status: {response.status_code}, Body: {response.text}")
+            results.update((s.id, None) for s in stories)
+            continue
+        ot.success(f"Moved {len(stories)} stories to '{board.get_status_from_id(status_id)}' in one request.")
+        moved += [(s, status_id) for s in stories]
+    if not moved:
+        return results
+
+    fresh = {}
+    for status_id in {status_id for _, status_id in moved}:
+        fresh.update((s.id, s) for s in board.list_stories(status_id))
+    tag_colors = project_tag_colors(board)
+
+    def finish_story(item):
+        story, status_id = item
+        latest = fresh.get(story.id)
+        if latest is None:
+            ot.error(f"'{story.subject}' was not found in '{board.get_status_from_id(status_id)}' after the bulk move.")
+            return ["find the card after the move"]
+        try:
+            return finish(story, latest, tag_colors)
+        except TaigaDegraded:
+            raise
+        except Exception as e:
+            ot.error(f"Exception occurred while updating '{story.subject}' after the bulk move: {e}")
+            return [str(e)]
+
+    with ThreadPoolExecutor(max_workers=MOVE_WORKERS) as pool:
+        for (story, _), failures in zip(moved, pool.map(finish_story, moved)):
+            results[story.id] = failures
+    return results
+
+def discharge_stories(board, stories):
+    # Moves every story in one bulk kanban request, then does one tag PATCH and one task bulk_create per story.
+    # Returns (discharged names, [(name, what went wrong)]) so the report can list the cards that need a look.
+    status_id = board.get_status_id(rules.discharge_status)
+    if status_id is None:
+        ot.error(f"Status '{rules.discharge_status}' not found, no one was discharged.")
+        return [], [(s.subject, f"not moved, status '{rules.discharge_status}' not found") for s in stories]
+
+    stories = [s for s in stories if s.status != status_id] # Already in the column
+    if not stories:
+        return [], []
+    task_status_id = board.get_task_status_id("Incomplete")
+
+    def finish_discharge(story, latest, tag_colors):
+        tags = [list(t) for t in (latest.tags or []) if t[0].lower() not in rules.rank_tags]
+        if not any(t[0].lower() == rules.discharge_tag for t in tags):
+            tags.append([rules.discharge_tag, tag_colors.get(rules.discharge_tag, "")])
+
+        response = client.patch(f"userstories/{story.id}", {"tags": tags, "version": latest.version})
+        if response.status_code not in (200, 201):
+            ot.error(f"Failed to update tags of '{story.subject}'. Status: {response.status_code}, Body: {response.text}")
+            return ["tags"]
+
+        response = client.post("tasks/bulk_create", {
+            "project_id": board.project.id,
+            "us_id": story.id,
+            "status_id": task_status_id,
+            "bulk_tasks": rules.discharge_task
+        })
+        if response.status_code not in (200, 201):
+            ot.error(f"Failed to create discharge task for '{story.subject}'. Status: {response.status_code}, Body: {response.text}")
+            return ["discharge task"]
+
+        ot.success(f"Discharged '{story.subject}'.")
+        return []
 
-def check_if_reached_4_strikes(user_story, cf_definitions, target_name):
     try:
-        if get_custom_attribute_value(user_story, cf_definitions, target_name) == "4 | 4 Weeks Inactive":
-            return True
+        results = bulk_move_stories(board, {status_id: stories}, finish_discharge)
+    except TaigaDegraded:
+        raise
+    except Exception as e:
+        ot.error(f"Exception occurred while bulk discharging: {e}")
+        return [], [(s.subject, f"discharge failed ({e}), check the card") for s in stories]
+
+    discharged = []
+    failed = []
+    for story in stories:
+        failures = results.get(story.id)
+        if failures is None:
+            failed.append((story.subject, f"couldn't move to {rules.discharge_status}"))
+        elif failures:
+            failed.append((story.subject, f"moved to {rules.discharge_status}, but failed to " + ", ".join(failures)))
         else:
-            return False
+            discharged.append(story.subject)
+    return discharged, failed
+
+def record_strike_history(board, story, week, PR_Result, activity, strikes_before, strikes_after):
+    try:
+        strike_history.append(board.key, story.id, story.subject, week, PR_Result, activity, strikes_before, strikes_after)
     except Exception as e:
-        ot.error(f"Exception occurred while retrieving custom field value: {e}")
-        return None    
-
-def get_next_strike(number):
-    if number == "1":
-        return "2 | 2 Weeks Inactive"
-    elif number == "2":
-        return "3 | 3 Weeks Inactive"
-    elif number == "3":
-        return "4 | 4 Weeks Inactive"
-    else:
-        return "1 | 1 Week Inactive"
-    
+        ot.error(f"Exception occurred while recording strike history for '{story.subject}': {e}")
 
-def strike_to_number(strike):
-    if strike == "1 | 1 Week Inactive":
-        return "1"
-    elif strike == "2 | 2 Weeks Inactive":
-        return "2"
-    elif strike == "3 | 3 Weeks Inactive":
-        return "3"
-    elif strike == "4 | 4 Weeks Inactive":
-        return "4"
-    else:
-        return "0"
+QUOTA_READ_WORKERS = 8 # Cards whose custom attribute values are read at the same time
 
-def process_user(story, user_input, PR_Result, Actual_Activity):
-        try:
-            try:
-                input_date = datetime.strptime(user_input, "%Y-%m-%d").date()
-
-                new_date = input_date + timedelta(days=7)
-            except ValueError:
-                ot.warn("Invalid date format. Please use YYYY-MM-DD.")
-
-            if PR_Result == "Failed":
-                Activity = get_custom_attribute_value(story, cf_definitions, "Activity Strikes")
-                Activity = strike_to_number(Activity)
-                Actual_Activity_When_Fail = Actual_Activity
-                success2 = update_custom_field(story, cf_definitions, "Activity Strikes", get_next_strike(Activity))
-                if not success2:
-                    ot.error("Update failed.")
-                else:
-                    ot.success("Successfully updated the custom attribute, CHECK TAIGA FOR CONFIRMATION")
-                Actual_Activity = Activity+" -> "+(strike_to_number(get_custom_attribute_value(story, cf_definitions, "Activity Strikes")))
-                comment_text = "**\[L-2\] Researcher Performance Review**\n\n"+str(input_date)+" - "+str(new_date)+"\n"+"PR Review: "+PR_Result+"\n"+"Activity Strikes: "+Actual_Activity
-                success2 = update_custom_field(story, cf_definitions, "Activity", Actual_Activity_When_Fail)
-                if not success2:
-                    ot.error("Update failed.")
-                else:
-                    ot.success("Successfully updated the custom attribute, CHECK TAIGA FOR CONFIRMATION")
-            else:
-                comment_text = "**\[L-2\] Researcher Performance Review**\n\n"+str(input_date)+" - "+str(new_date)+"\n"+"PR Review: "+PR_Result+"\n"+"Activity: "+Actual_Activity
-                success2 = update_custom_field(story, cf_definitions, "Activity", Actual_Activity)
-                if not success2:
-                    ot.error("Update failed.")
-                else:
-                    ot.success("Successfully updated the custom attribute, CHECK TAIGA FOR CONFIRMATION")
-
-            if comment_text:
-                add_isolated_comment(story, comment_text)
-                ot.success("Comment added.")
-                return True
-            else:
-                ot.info("Skipped.")
+def snapshot_quota(board, rows):
+    # One listing of the board, then the custom attribute values of the matched cards only
+    matched = match_rows(board, rows, board.list_stories())
+    stories = [story for story, _ in matched[0]]
+    with ThreadPoolExecutor(max_workers=QUOTA_READ_WORKERS) as pool:
+        payloads = list(pool.map(lambda story: get_story_attributes(story.id), stories))
+    return matched, {story.id: payload for story, payload in zip(stories, payloads)}
+
+def apply_card_plan(board, plan, card):
+    # At most two writes: every changed attribute in one PATCH, then the review comment
+    story = card.story
+    try:
+        if card.changes:
+            response = client.patch(f"userstories/custom-attributes-values/{story.id}", {
+                "attributes_values": card.new_values(),
+                "version": card.values_version
+            })
+            if response.status_code not in (200, 201):
+                # Not retried, the new values were worked out from the snapshot
+                ot.error(f"Failed to update the attributes of '{story.subject}'. Status: {response.status_code}, Body: {response.text}")
                 return False
-        except Exception as ex:
-            ot.error(f"Unexpected exception: {ex}")
+
+        response = client.patch(f"userstories/{story.id}", {"comment": card.comment, "version": story.version})
+        if response.status_code == 400 and "version" in response.text:
+            # The card was edited since the snapshot, a comment is safe to retry on the current version
+            latest = client.get(f"userstories/{story.id}").json()
+            response = client.patch(f"userstories/{story.id}", {"comment": card.comment, "version": latest["version"]})
+        if response.status_code not in (200, 201):
+            ot.error(f"Failed to add the review comment to '{story.subject}'. Status: {response.status_code}, Body: {response.text}")
+            return False
+
+        ot.success(f"Applied the quota plan to '{story.subject}' ({len(card.changes)} attribute changes).")
+        record_strike_history(board, story, plan.week, card.quota, card.activity, card.strikes_before, card.strikes_after)
+        return True
+    except TaigaDegraded:
+        raise
+    except Exception as e:
+        ot.error(f"Exception occurred while applying the quota plan to '{story.subject}': {e}")
         return False
 
+STORY_INDEX_REFRESH = 120 # Seconds between background refreshes of the /promote card index
+index_warmer = None
+
+async def keep_story_indexes_warm():
+    while True:
+        for board in boards.loaded():
+            if board.promotion_columns:
+                try:
+                    await asyncio.to_thread(board.refresh_story_index)
+                except Exception as e:
+                    ot.warn(f"[{board.key}] Could not refresh the card index: {e}")
+        await asyncio.sleep(STORY_INDEX_REFRESH)
+
 @bot.event
 async def on_ready():
+    global index_warmer
     ot.core(f"Logged in as {bot.user} (ID: {bot.user.id})")
+    if index_warmer is None: # on_ready runs again after every reconnect
+        index_warmer = asyncio.create_task(keep_story_indexes_warm())
     try:
         synced = await tree.sync()
         ot.core(f"Synced {len(synced)} slash commands.")
@@ -613,10 +507,39 @@ async def on_ready():
         ot.error(f"Failed to sync commands: {e}")
 
 @tree.command(name="parsequota", description="Parse quota data and match to user stories.")
-@app_commands.describe(date_string="Date to use in format YYYY-MM-DD")
-async def parse_quota(interaction: discord.Interaction, date_string: str):
+@app_commands.describe(
+    date_string="Date to use in format YYYY-MM-DD",
+    board="Board to update, defaults to this server's board.",
+    auto_discharge=f"Move everyone who reaches {rules.discharge_at} activity strikes to {rules.discharge_status}",
+    dry_run="Only show what would change, nothing is written to Taiga"
+)
+@app_commands.choices(board=BOARD_CHOICES)
+async def parse_quota(interaction: discord.Interaction, date_string: str, board: app_commands.Choice[str] = None, auto_discharge: bool = False, dry_run: bool = False):
     await interaction.response.send_message("✅ Running quota match...", ephemeral=True)
 
+    try:
+        target_board = await asyncio.to_thread(get_board, interaction, board)
+    except Exception as e:
+        await interaction.followup.send(f"Could not load board: {e}", ephemeral=True)
+        return
+
+    prof = profiler.take("parsequota")
+    try:
+        # Commands on the same board wait for each other, commands on other boards keep running
+        async with target_board.command_lock:
+            await run_quota_match(interaction, target_board, date_string, auto_discharge, dry_run, prof)
+    finally:
+        await report_profile(prof)
+
+
+async def run_quota_match(interaction, board, date_string, auto_discharge=False, dry_run=False, prof=NullProfile()):
+
+    try:
+        week = datetime.strptime(date_string, "%Y-%m-%d").date()
+    except ValueError:
+        await interaction.followup.send("Invalid date format. Please use YYYY-MM-DD.", ephemeral=True)
+        return
+
     source_channel = bot.get_channel(source_channel_id)
     destination_channel = bot.get_channel(destination_channel_id)
 
@@ -625,84 +548,174 @@ async def parse_quota(interaction: discord.Interaction, date_string: str):
         return
 
     # === Step 1: Read quota report ===
-    messages = [msg async for msg in source_channel.history(limit=1)]
-    if not messages:
-        await destination_channel.send("No quota report message found.")
+    with prof.phase("read report"):
+        messages = [msg async for msg in source_channel.history(limit=1)]
+        if not messages:
+            await destination_channel.send("No quota report message found.")
+            return
+        rows = parse_report(messages[0].content)
+
+    progress = ProgressReporter(interaction, total=len(rows))
+    await progress.start(stage="Report parsed")
+    processed = 0
+
+    # === Step 2: Plan every change from one snapshot of the board ===
+    degraded = None
+    plan = None
+    try:
+        await progress.update(stage="Reading the board", force=True)
+        with prof.phase("snapshot"):
+            matched, attributes = await asyncio.to_thread(prof.call, run_in_read_scope, snapshot_quota, board, rows)
+        with prof.phase("plan"):
+            plan = plan_quota(board, rules, week, matched, attributes)
+    except TaigaDegraded as e:
+        degraded = e
+        ot.error(f"Stopping quota match: {e}")
+
+    if dry_run:
+        if degraded:
+            # Nothing was written, so there's nothing for the destination channel
+            await progress.finish(f"⚠️ Dry run stopped, {degraded}. Nothing was written.")
+            ot.info("End of command (dry run)")
+            return
+        await progress.finish(f"✅ Dry run complete, {plan.writes} writes planned for {len(plan.cards)} users. Nothing was written.")
+        await send_long_message(interaction.followup, plan.summary(board.key, rules, auto_discharge), filename=f"quota_plan_{date_string}.txt", ephemeral=True)
+        ot.info("End of command (dry run)")
         return
 
-    last_message = messages[0].content.strip()
-    lines = last_message.split('\n')
-    library = []
-
-    for line in lines:
+    # === Step 3: Apply the non-empty diffs, one card at a time ===
+    failed = []
+    applied = set() # story ids of the cards whose writes all went through
+    discharged = []
+    discharge_failed = [] # (name, reason)
+    if plan:
+        progress.total = len(plan.cards)
         try:
-            parts = [p.strip() for p in line.split('|')]
-            name = parts[0]
-            quota = parts[1].split(':')[1].strip()
-            activity = parts[2].split(':')[1].strip()
-            library.append([name, quota, activity])
-        except (IndexError, ValueError):
-            continue  # Skip malformed lines
-
-    # === Step 2: Try matching in multiple columns ===
-    taiga_mismatches = []
-    google_mismatches = []
-    ac_strikes = []
-
-    status_order = [
-        TARGET_STATUS_NAME,
-        SECOND_TARGET_STATUS_NAME,
-        THIRD_TARGET_STATUS_NAME,
-        FOURTH_TARGET_STATUS_NAME,
-        FIFTH_TARGET_STATUS_NAME
-    ]
-
-    for status_name in status_order:
-        # Reset TAIGA mismatches for each pass, but keep library only for unmatched ones
-        taiga_mismatches.clear()
-        google_mismatches.clear()
-
-        for story in get_stories_in_column(status_name):
-            story_name = story.subject
-            match = None
-            for row in library:
-                if row[0] == story_name:
-                    match = row
-                    break
-
-            if match:
-                PR_Result = match[1]
-                Actual_Activity = match[2]
-                success = await asyncio.to_thread(process_user, story, date_string, PR_Result, Actual_Activity)
-                if not success:
-                    ot.error(f"Failed processing {story_name}")
-                library.remove(match)
-                if check_if_reached_4_strikes(story, cf_definitions, "Activity Strikes"):
-                    ac_strikes.append(story_name+" Has reached 4 activity strikes"+"\n")
-            else:
-                taiga_mismatches.append(story_name)
-
-        for leftover in library:
-            google_mismatches.append(leftover[0])
-
-        if not google_mismatches:
-            break
-
-    # === Step 3: Prepare final report ===
-    report_lines = []
-
-    if google_mismatches:
-        for name in google_mismatches:
-            report_lines.append(f"Couldn't find any matches for {name} [GOOGLE]")
-    
-    if ac_strikes:
-        for strike in ac_strikes:
-            report_lines.append(strike)
-
-    final_report = "Quota Import Report:\n" + "\n".join(report_lines) if report_lines else "Quota Import Report:\nAll matches successful."
-    await destination_channel.send(final_report)
+            await progress.update(0, stage=f"Updating {len(plan.cards)} cards", force=True)
+            for card in plan.cards:
+                with prof.phase("per-story update"):
+                    if await asyncio.to_thread(prof.call, apply_card_plan, board, plan, card):
+                        applied.add(card.story.id)
+                    else:
+                        failed.append(card.story.subject)
+                processed += 1
+                await progress.update(processed)
+
+            # A card whose strikes weren't written may not be at the threshold, only applied cards are discharged
+            candidates = [story for story in plan.discharge_candidates if story.id in applied]
+            if auto_discharge and candidates:
+                await progress.update(processed, stage=f"Discharging {len(candidates)} users", force=True)
+                with prof.phase("discharge"):
+                    discharged, discharge_failed = await asyncio.to_thread(prof.call, discharge_stories, board, candidates)
+        except TaigaDegraded as e:
+            # Taiga is failing fast, stop here instead of hanging on every remaining user
+            degraded = e
+            ot.error(f"Stopping quota match: {e}")
+
+    # === Step 4: Prepare final report ===
+    with prof.phase("report"):
+        report_lines = []
+
+        if degraded:
+            not_processed = [card.story.subject for card in plan.cards[processed:]] if plan else [row[0] for row in rows]
+            report_lines.append(f"⚠️ {degraded}. Stopped after {processed}/{progress.total} users.")
+            report_lines.append("Not processed: " + (", ".join(not_processed) or "nobody"))
+        elif plan.unmatched_rows:
+            for name in plan.unmatched_rows:
+                report_lines.append(f"Couldn't find any matches for {name} [GOOGLE]")
+
+        if plan:
+            for name in failed:
+                report_lines.append(f"⚠️ Failed to update {name}, check the card. Unknown whether they reached {rules.discharge_at} activity strikes.")
+            for name, problem in plan.problems:
+                report_lines.append(f"⚠️ {name}: {problem}")
+            for card in plan.cards:
+                if card.discharge_due and card.story.id in applied:
+                    report_lines.append(card.story.subject+f" Has reached {rules.discharge_at} activity strikes"+"\n")
+
+        if discharged:
+            report_lines.append(f"Moved to {rules.discharge_status}: " + ", ".join(discharged))
+        for name, reason in discharge_failed:
+            report_lines.append(f"⚠️ {name}: {reason}")
+        if auto_discharge and plan:
+            for story, reason in plan.discharge_held:
+                if story.id in applied:
+                    report_lines.append(f"Not moved to {rules.discharge_status}, {reason}: {story.subject}")
+
+        final_report = f"Quota Import Report ({board.key}):\n" + "\n".join(report_lines) if report_lines else f"Quota Import Report ({board.key}):\nAll matches successful."
+        await progress.update(processed, stage="Sending report", force=True)
+        await send_long_message(destination_channel, final_report, filename=f"quota_report_{date_string}.txt")
+        await progress.finish(f"⚠️ {degraded}. Stopped after {progress.processed}/{progress.total} users, see the report." if degraded else None)
     ot.info("End of command")
 
+async def report_profile(prof):
+    # Writes the profile of a finished command to disk and DMs the summary to the admin who asked for it
+    if not prof.enabled:
+        return
+    try:
+        summary, stats_path = await asyncio.to_thread(prof.finish)
+        admin = bot.get_user(prof.admin_id) or await bot.fetch_user(prof.admin_id)
+        await send_long_message(admin, summary, filename=f"{prof.command}_profile.txt")
+        if stats_path:
+            await admin.send(file=discord.File(stats_path))
+        ot.info(f"Profile of /{prof.command} written to {stats_path}")
+    except Exception as e:
+        ot.error(f"Exception occurred while reporting profile of /{prof.command}: {e}")
+
+@tree.command(name="profile", description="Profile the next runs of a command (admin only).")
+@app_commands.describe(command="Command to profile", runs="How many of its next runs to profile, 0 cancels")
+@app_commands.choices(command=[app_commands.Choice(name=c, value=c) for c in PROFILED_COMMANDS])
+@app_commands.default_permissions(administrator=True)
+async def profile(interaction: discord.Interaction, command: app_commands.Choice[str], runs: app_commands.Range[int, 0, 20] = 1):
+    if not getattr(interaction.user, "guild_permissions", None) or not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("Only administrators can profile commands.", ephemeral=True)
+        return
+
+    profiler.arm(command.value, runs, interaction.user.id)
+    if runs:
+        await interaction.response.send_message(f"🔬 Profiling the next {runs} run(s) of /{command.value}, results will be sent to you in DMs.", ephemeral=True)
+    else:
+        await interaction.response.send_message(f"Profiling of /{command.value} cancelled.", ephemeral=True)
+
+@tree.command(name="strikes", description="Activity strike analytics from the local history, doesn't touch Taiga.")
+@app_commands.describe(
+    view="What to show",
+    weeks="How many weeks back to look",
+    threshold="Minimum strikes gained in the window to be listed as at risk",
+    board="Board to report on, defaults to this server's board."
+)
+@app_commands.choices(
+    view=[
+        app_commands.Choice(name="At risk", value="at_risk"),
+        app_commands.Choice(name="Distribution", value="distribution"),
+        app_commands.Choice(name="Trend", value="trend")
+    ],
+    board=BOARD_CHOICES
+)
+async def strikes(interaction: discord.Interaction, view: app_commands.Choice[str], weeks: app_commands.Range[int, 1, 104] = 8, threshold: app_commands.Range[int, 1, len(rules.strike_levels) - 1] = max(rules.discharge_at - 1, 1), board: app_commands.Choice[str] = None):
+    key = board.value if board else boards.guild_boards.get(interaction.guild_id, boards.default)
+    started = time.perf_counter()
+
+    match view.value:
+        case "at_risk":
+            rows = strike_history.at_risk(key, weeks, threshold)
+            lines = [f"**{key} - {threshold}+ activity strikes in the last {weeks} weeks ({len(rows)})**"]
+            lines += [f"{name}: +{gained} (currently {level})" for name, gained, level in rows] or ["Nobody."]
+        case "distribution":
+            counts = strike_history.distribution(key, weeks, len(rules.strike_levels))
+            lines = [f"**{key} - current activity strikes, members reviewed in the last {weeks} weeks**"]
+            lines += [f"{level} strikes: {count}" for level, count in enumerate(counts)]
+        case _:
+            rows = strike_history.trend(key, weeks)
+            lines = [f"**{key} - weekly activity strikes, last {weeks} weeks**"]
+            lines += [f"{week}: {reviews} reviewed, {given} strikes given" for week, reviews, given in rows] or ["No reviews recorded."]
+
+    lines.append(f"-# {len(strike_history)} records, computed in {(time.perf_counter() - started) * 1000:.1f} ms")
+    chunks = split_message("\n".join(lines))
+    await interaction.response.send_message(chunks[0], ephemeral=True)
+    for chunk in chunks[1:]:
+        await interaction.followup.send(chunk, ephemeral=True)
+
 # ------------------------------ WORK IN PROGRESS ------------------------------
 
 class CardInfoModal(discord.ui.Modal):
@@ -789,51 +802,66 @@ No Enforcement Actions.<br>
 No Inactivity Notices.<br>
 """
 
-        try:
-            # 1️⃣ Create the card
-            new_story = api.user_stories.create(
-                project=project.id,
-                subject=roblox_name,  # Card name from Roblox field
-                description=description_html
-            )
-
-
-            # 2️⃣ Add the "Education Program" task
-            api.tasks.create(
-                project=project.id,
-                user_story=new_story.id,
-                status = get_task_status_id("Incomplete"),
-                subject="Education Program"
-            )
+        if mode.upper() not in boards.keys():
+            await interaction.followup.send(f"Invalid command mode '{mode}', expected one of: {', '.join(boards.keys())}", ephemeral=True)
+            return
 
-            api.tasks.create(
-                project=project.id,
-                user_story=new_story.id,
-                status = get_task_status_id("Incomplete"),
-                subject="Current Rank: Assistant Researcher"
-            )
-
-            # 3️⃣ Add the "assistant researcher" tag
-            updated_tags = list(new_story.tags) if new_story.tags else []
-            if "assistant researcher" not in [t.lower() for t in updated_tags]:
-                isolated_tag_change("add", new_story, "assistant researcher")
-            if "divisional trialing" not in [t.lower() for t in updated_tags]:
-                isolated_tag_change("add", new_story, "division trialing")
-            
-            new_story = api.user_stories.get(new_story.id)
-
-            update_custom_field(new_story, cf_definitions, "Timezone", timezone)
-            update_custom_field(new_story, cf_definitions, "Divisional Status", "Personnel")
-            update_custom_field(new_story, cf_definitions, "Divisional Strikes", "0")
-            update_custom_field(new_story, cf_definitions, "Activity Strikes", "0")
+        prof = profiler.take("create_card")
+        try:
+            with prof.phase("resolve board"):
+                board = await asyncio.to_thread(boards.get, mode)
+            async with board.command_lock:
+                with prof.phase("create card"):
+                    await asyncio.to_thread(prof.call, run_in_read_scope, create_new_card, board, roblox_name, description_html, timezone)
 
             await interaction.followup.send(
-                f"Card '{roblox_name}' created successfully with Education Program task and tag.",
+                f"Card '{roblox_name}' created successfully on the {board.key} board with Education Program task and tag.",
                 ephemeral=True
             )
 
         except Exception as e:
             await interaction.followup.send(f"Failed to create card: {e}", ephemeral=True)
+        finally:
+            await report_profile(prof)
+
+
+def create_new_card(board, roblox_name, description_html, timezone):
+    # 1️⃣ Create the card
+    new_story = api.user_stories.create(
+        project=board.project.id,
+        subject=roblox_name,  # Card name from Roblox field
+        description=description_html
+    )
+
+
+    # 2️⃣ Add the "Education Program" task
+    api.tasks.create(
+        project=board.project.id,
+        user_story=new_story.id,
+        status = board.get_task_status_id("Incomplete"),
+        subject="Education Program"
+    )
+
+    api.tasks.create(
+        project=board.project.id,
+        user_story=new_story.id,
+        status = board.get_task_status_id("Incomplete"),
+        subject="Current Rank: Assistant Researcher"
+    )
+
+    # 3️⃣ Add the "assistant researcher" tag
+    updated_tags = list(new_story.tags) if new_story.tags else []
+    if "assistant researcher" not in [t.lower() for t in updated_tags]:
+        isolated_tag_change(board, "add", new_story, "assistant researcher")
+    if "divisional trialing" not in [t.lower() for t in updated_tags]:
+        isolated_tag_change(board, "add", new_story, "division trialing")
+    
+    new_story = api.user_stories.get(new_story.id)
+
+    update_custom_field(new_story, board.cf_definitions, "Timezone", timezone)
+    update_custom_field(new_story, board.cf_definitions, "Divisional Status", "Personnel")
+    update_custom_field(new_story, board.cf_definitions, "Divisional Strikes", "0")
+    update_custom_field(new_story, board.cf_definitions, rules.strike_field, rules.strike_levels[0])
 
 
 @tree.command(name="create_card", description="Create a new Taiga card with preset description from pasted details.")
@@ -841,87 +869,206 @@ async def create_card(interaction: discord.Interaction):
     await interaction.response.send_modal(CardInfoModal())
 
 
+def promote_user(board, name):
+    # Returns the reply for the moderator who asked
+    match = board.story_index.get(name)
+    if match is None:
+        # The index may not have caught up with a card that was just created or moved yet
+        match = board.refresh_story_index().get(name)
+    if match is None:
+        ot.error(f"User card '{name}' not found in: {', '.join(board.promotion_columns)}")
+        return f"Couldn't find a card named '{name}' in {', '.join(board.promotion_columns)}."
+    ot.success("User card found.")
+
+    currentStatusId = match.status
+    currentStatusName = board.get_status_from_id(currentStatusId)
+    promotion = rules.promotions.get(currentStatusName)
+    newStatusId = board.get_status_id(promotion.target) if promotion else None
+    if newStatusId is None:
+        ot.error(f"No promotion from '{currentStatusName}' in the rank rules, no action taken.")
+        return f"⚠️ No promotion from {currentStatusName}, '{match.subject}' was not changed."
+
+    if not add_isolated_status(board, match, newStatusId, expected_status=currentStatusId):
+        if match.status != currentStatusId:
+            return f"⚠️ '{match.subject}' was moved to {board.get_status_from_id(match.status)} in the meantime, nothing was changed. Try again if it should still be promoted."
+        return f"⚠️ Couldn't move '{match.subject}' to {promotion.target}, nothing was changed."
+    board.note_moved(match, newStatusId)
+
+    if promotion.status_only:
+        ot.success(f"Promoted '{match.subject}' to {promotion.target}.")
+        return f"✅ Promoted '{match.subject}' from {currentStatusName} to {promotion.target}."
+
+    unfinished = f"⚠️ Moved '{match.subject}' to {promotion.target}, but couldn't finish the promotion"
+    try:
+        # The move bumped the card's version
+        response = client.get(f"userstories/{match.id}")
+        if response.status_code != 200:
+            ot.error(f"Failed to re-fetch '{match.subject}' after the move. Status: {response.status_code}, Body: {response.text}")
+            return f"{unfinished} (status {response.status_code} re-fetching the card). Update its tasks and tags by hand."
+        latest = StoryRecord.from_json(response.json())
+        failures = apply_promotion_steps(board, match, promotion, latest, project_tag_colors(board))
+    except TaigaDegraded:
+        raise
+    except Exception as e:
+        ot.error(f"Exception occurred while finishing the promotion of '{match.subject}': {e}")
+        return f"{unfinished} ({e}). Update its tasks and tags by hand."
+    if failures:
+        ot.error(f"Promoted '{match.subject}' to {promotion.target}, but failed to " + ", ".join(failures))
+        return f"⚠️ Promoted '{match.subject}' to {promotion.target}, but failed to " + ", ".join(failures) + ". Check the card."
+    ot.success(f"Promoted '{match.subject}' to {promotion.target}.")
+    return f"✅ Promoted '{match.subject}' from {currentStatusName} to {promotion.target}."
+
+
+def apply_promotion_steps(board, story, promotion, latest, tag_colors):
+    # One task listing, then at most one request per task change and one tag PATCH for the card
+    if promotion.status_only:
+        return []
+    response = client.get("tasks", params={"project": board.project.id, "user_story": story.id}, paginate=False)
+    if response.status_code != 200:
+        raise ValueError(f"Failed to list tasks. Status: {response.status_code}, Body: {response.text}")
+    tasks = {t["subject"].lower(): t for t in response.json() if t.get("subject")}
+    failures = []
+
+    old, new = promotion.rename_task
+    task = tasks.get(old.lower())
+    if task is None or client.patch(f"tasks/{task['id']}", {"subject": new, "version": task["version"]}).status_code not in (200, 201):
+        failures.append(f"rename '{old}'")
+
+    if promotion.complete_task:
+        task = tasks.get(promotion.complete_task.lower())
+        if task is None or client.patch(f"tasks/{task['id']}", {"status": board.get_task_status_id("Complete"), "version": task["version"]}).status_code not in (200, 201):
+            failures.append(f"complete '{promotion.complete_task}'")
+
+    if promotion.create_task:
+        response = client.post("tasks", {
+            "project": board.project.id,
+            "user_story": story.id,
+            "status": board.get_task_status_id("Incomplete"),
+            "subject": promotion.create_task
+        })
+        if response.status_code not in (200, 201):
+            failures.append(f"create '{promotion.create_task}'")
+
+    tags = [list(t) for t in (latest.tags or []) if t[0].lower() not in promotion.remove_tags]
+    for name in promotion.add_tags:
+        if not any(t[0].lower() == name for t in tags):
+            tags.append([name, tag_colors.get(name, "")])
+    response = client.patch(f"userstories/{story.id}", {"tags": tags, "version": latest.version})
+    if response.status_code not in (200, 201):
+        failures.append("tags")
+
+    return failures
+
+def promote_batch_users(board, names):
+    # Resolves every name against one snapshot of the board, then moves each group of cards going
+    # to the same rank with one bulk request and updates tasks and tags for several cards at once
+    board.refresh_story_index()
+    not_found = []
+    groups = {} # current rank -> stories
+    for name in names:
+        story = board.story_index.get(name)
+        if story is None:
+            not_found.append(name)
+            continue
+        groups.setdefault(board.get_status_from_id(story.status), []).append(story)
+
+    moves = {} # target status id -> stories
+    promotions = {} # story id -> promotion
+    failed = [] # (name, reason)
+    for current, stories in groups.items():
+        promotion = rules.promotions.get(current)
+        status_id = board.get_status_id(promotion.target) if promotion else None
+        if status_id is None:
+            failed += [(s.subject, f"no promotion from {current}") for s in stories]
+            continue
+        moves[status_id] = stories # Each rank has a single next rank, so groups never share a target
+        promotions.update((s.id, promotion) for s in stories)
+
+    results = bulk_move_stories(board, moves, lambda story, latest, tag_colors: apply_promotion_steps(board, story, promotions[story.id], latest, tag_colors))
+
+    done = {}
+    promoted = 0
+    for status_id, stories in moves.items():
+        for story in stories:
+            promotion = promotions[story.id]
+            failures = results.get(story.id)
+            if failures is None:
+                failed.append((story.subject, f"couldn't move to {promotion.target}"))
+                continue
+            promoted += 1
+            board.note_moved(story, status_id)
+            done.setdefault((promotion.current, promotion.target), []).append(story.subject)
+            if failures:
+                failed.append((story.subject, "promoted, but failed to " + ", ".join(failures)))
+
+    lines = [f"**Batch promotion ({board.key})**: {promoted}/{len(names)} promoted"]
+    for (current, target), subjects in done.items():
+        lines.append(f"{current} → {target} ({len(subjects)}): {', '.join(subjects)}")
+    for name, reason in failed:
+        lines.append(f"⚠️ {name}: {reason}")
+    if not_found:
+        lines.append(f"Not found in {', '.join(board.promotion_columns)}: {', '.join(not_found)}")
+    return "\n".join(lines)
+
+@tree.command(name="promote_batch", description="promote several users on taiga at once")
+@app_commands.describe(names="Names of the target cards, separated by commas or new lines.", board="Board to use, defaults to this server's board.")
+@app_commands.choices(board=BOARD_CHOICES)
+async def promote_batch(interaction: discord.Interaction, names: str, board: app_commands.Choice[str] = None):
+    prof = profiler.take("promote_batch")
+    try:
+        await interaction.response.send_message("✅ Promoting users...", ephemeral=True)
+        name_list = list(dict.fromkeys(n.strip() for n in re.split(r"[,\n]", names) if n.strip()))
+        with prof.phase("resolve board"):
+            target_board = await asyncio.to_thread(get_board, interaction, board)
+        async with target_board.command_lock:
+            with prof.phase("promote"):
+                summary = await asyncio.to_thread(prof.call, run_in_read_scope, promote_batch_users, target_board, name_list)
+        for chunk in split_message(summary):
+            await interaction.followup.send(chunk, ephemeral=True)
+
+    except TaigaDegraded as e:
+        ot.error(f"Batch promote command stopped: {e}")
+        await interaction.followup.send(f"⚠️ {e}. Some promotions may be incomplete, check the cards.", ephemeral=True)
+    except Exception as e:
+        ot.error(f"An unexpected error occurred while executing batch promote command: {e}")
+        await interaction.followup.send(f"Batch promotion failed: {e}", ephemeral=True)
+    finally:
+        await report_profile(prof)
+
+
 @tree.command(name="promote", description="promote a user on taiga")
-@app_commands.describe(name="Insert the name of the target card.")
-async def parse_quota(interaction: discord.Interaction, name: str):
+@app_commands.describe(name="Insert the name of the target card, start typing for suggestions.", board="Board to use, defaults to this server's board.")
+@app_commands.choices(board=BOARD_CHOICES)
+async def promote(interaction: discord.Interaction, name: str, board: app_commands.Choice[str] = None):
+    prof = profiler.take("promote")
     try:
         await interaction.response.send_message("✅ Promoting user...", ephemeral=True)
-        status_order = [
-            "Assistant Researcher",
-            "Researcher",
-            "Senior Researcher",
-            "Instructor",
-            "Supervisor",
-        ]
-
-        for status_name in status_order:
-            match = None
-            for story in get_stories_in_column(status_name):
-                story_name = story.subject
-                if story_name == name:
-                    match = story
-
-                if match:
-                    break
-            
-            if match:
-                ot.success("User card found.")
-                break
-            else:
-                ot.error(f"User card not found in: {status_name}")
-
-        currentStatusId = match.status
-        currentStatusName = get_status_from_id(currentStatusId)
-        newStatusName = get_next_status_for_promo(currentStatusName)
-        newStatusId = get_status_id(newStatusName)
-
-        if currentStatusId:
-            add_isolated_status(match, newStatusId)
-        else:
-            ot.error("Status ID not found.")
-
-        match newStatusName:
-            case "Researcher":
-                isolated_task_change("ren", match, "Current Rank: Assistant Researcher", "Current Rank: Researcher")
-                isolated_task_change("sta", match, "Education Program", "Complete")
-                api.tasks.create(
-                    project=project.id,
-                    user_story=match.id,
-                    status = get_task_status_id("Incomplete"),
-                    subject="Researcher Advancement Program"
-                )
-                ot.success('Successfully created task "Researcher Advancement Program"')
-                isolated_tag_change("rem", match, "assistant researcher")
-                isolated_tag_change("rem", match, "divisional trialing")
-                isolated_tag_change("add", match, "researcher")
-            case "Senior Researcher":
-                isolated_task_change("ren", match, "Current Rank: Researcher", "Current Rank: Senior Researcher")
-                isolated_task_change("sta", match, "Researcher Advancement Program", "Complete")
-                api.tasks.create(
-                    project=project.id,
-                    user_story=match.id,
-                    status = get_task_status_id("Incomplete"),
-                    subject="Instructor Training Program"
-                )
-                ot.success('Successfully created task "Instructor Training Program"')
-                isolated_tag_change("rem", match, "researcher")
-                isolated_tag_change("add", match, "senior researcher")
-            case "Instructor":
-                isolated_task_change("ren", match, "Current Rank: Senior Researcher", "Current Rank: Instructor")
-                isolated_task_change("sta", match, "Instructor Training Program", "Complete")
-                isolated_tag_change("rem", match, "senior researcher")
-                isolated_tag_change("add", match, "instructor")
-            case "Supervisor":
-                isolated_task_change("ren", match, "Current Rank: Instructor", "Current Rank: Supervisor")
-                isolated_tag_change("rem", match, "instructor")
-                isolated_tag_change("add", match, "supervisor")
-            case _:
-                ot.error("Invalid status name recieved in promote function, no action taken.")
-            
+        with prof.phase("resolve board"):
+            target_board = await asyncio.to_thread(get_board, interaction, board)
+        async with target_board.command_lock:
+            with prof.phase("promote"):
+                reply = await asyncio.to_thread(prof.call, run_in_read_scope, promote_user, target_board, name)
+        await interaction.followup.send(reply, ephemeral=True)
+
+    except TaigaDegraded as e:
+        ot.error(f"Promote command stopped: {e}")
+        await interaction.followup.send(f"⚠️ {e}. The promotion may be incomplete, check the card.", ephemeral=True)
+    except Exception as e:
+        ot.error(f"An unexpected error occurred while executing promote command: {e}")
+        await interaction.followup.send(f"Promotion failed: {e}. Check the card, it may have been moved already.", ephemeral=True)
+    finally:
+        await report_profile(prof)
 
 
-    except Exception as e:
-        ot.error(f"An unexpected error occurred while executing promote command: {e}")     
+
+@promote.autocomplete("name")
+async def promote_name_autocomplete(interaction: discord.Interaction, current: str):
+    # Answers from the in-memory index only, Discord drops autocomplete answers after 3 seconds
+    key = getattr(interaction.namespace, "board", None) or boards.guild_boards.get(interaction.guild_id, boards.default)
+    board = boards.peek(key)
+    if board is None:
+        return []
+    return [app_commands.Choice(name=subject[:100], value=subject[:100]) for subject in board.story_index.suggest(current)]
 
 
 
@@ -0,0 +1,60 @@
+import gc
+import sys
+import time
+import tracemalloc
+from taiga.models import UserStories
+from story_records import decode_stories
+
+# Memory benchmark: python-taiga UserStory objects vs StoryRecords for one board listing.
+# Runs offline on synthetic payloads shaped like Taiga's /userstories listing.
+#   python bench_story_records.py [number of stories]
+
+
+def fake_story(i):
+    user = {"big_photo": None, "full_name_display": f"Moderator {i % 7}", "gravatar_id": "0" * 32, "id": 1000 + i % 7, "is_active": True, "photo": None, "username": f"mod{i % 7}"}
+    return {
+        "assigned_to": None, "assigned_to_extra_info": None, "assigned_users": [], "backlog_order": 1700000000000 + i,
+        "blocked_note": "", "client_requirement": False, "comment": "", "created_date": "2025-01-01T12:00:00.000Z",
+        "due_date": None, "due_date_reason": "", "due_date_status": "not_set", "epic_order": None, "epics": None,
+        "external_reference": None, "finish_date": None, "generated_from_issue": None, "generated_from_task": None,
+        "id": 500000 + i, "is_blocked": False, "is_closed": False, "is_voter": False, "is_watcher": False,
+        "kanban_order": 1700000000000 + i, "milestone": None, "milestone_name": None, "milestone_slug": None,
+        "modified_date": "2025-06-01T12:00:00.000Z", "owner": user["id"], "owner_extra_info": user,
+        "points": {"1": 1, "2": 1, "3": 1, "4": 1}, "project": 1234,
+        "project_extra_info": {"id": 1234, "logo_small_url": None, "name": "Aegis Research Division", "slug": "sevencuts-aegis-research-division-1"},
+        "ref": i + 1, "sprint_order": 1700000000000 + i, "status": 10 + i % 5,
+        "status_extra_info": {"color": "#70728F", "is_closed": False, "name": "Researcher"},
+        "subject": f"Researcher{i:05d}", "swimlane": None, "tags": [["researcher", None], ["division trialing", "#A8E440"]],
+        "tasks": [], "team_requirement": False, "total_attachments": 0, "total_comments": 3, "total_points": None,
+        "total_voters": 0, "total_watchers": 1, "tribe_gig": None, "version": 7, "watchers": [user["id"]]
+    }
+
+
+def measure(build, payload):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    stories = build(payload)
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return stories, retained, peak, elapsed
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    payload = [fake_story(i) for i in range(count)]
+
+    # The payload itself is freed after a listing, only what the bot keeps from it is measured.
+    # UserStory keeps references to the payload's nested dicts, which were allocated before measuring,
+    # so its numbers are a lower bound.
+    results = [
+        ("python-taiga UserStory", measure(UserStories(requester=None).parse_list, payload)),
+        ("StoryRecord", measure(decode_stories, payload)),
+    ]
+
+    print(f"{count} stories")
+    for name, (stories, retained, peak, elapsed) in results:
+        print(f"{name:<24} {retained / 1024:9.1f} KB retained  {retained / count:7.0f} B/story  {elapsed * 1000:7.1f} ms")
+    saving = 1 - results[1][1][1] / results[0][1][1]
+    print(f"StoryRecord saves {saving:.0%} of the retained memory")
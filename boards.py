@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import output as ot
+from story_records import decode_stories
+from story_index import StoryIndex
+
+# Board contexts.
+#
+# Each division (AOA, ARD, AAST) has its own Taiga board. A Board holds everything that used to be
+# a module global in the bot (project, story statuses, custom attribute definitions, quota columns)
+# and caches it, so one bot process can serve every division. All boards share one TaigaClient.
+
+# slug is the identifier of the taiga board (the credentials you gave the bot must have access to it)
+# quota_columns are the columns parsequota looks in, in order
+# promotion_columns are the columns /promote can promote from, their cards are indexed for autocomplete
+BOARDS = {
+    "ARD": {
+        "slug": "sevencuts-aegis-research-division-1",
+        "quota_columns": [
+            "Researcher",
+            "Senior Researcher",
+            "Discharging Personnel",
+            "Exempted Personnel",
+            "Assistant Researcher"
+        ],
+        "promotion_columns": [
+            "Assistant Researcher",
+            "Researcher",
+            "Senior Researcher",
+            "Instructor",
+            "Supervisor"
+        ]
+    },
+    "AOA": {
+        "slug": "TO REPLACE", # AOA board slug
+        "quota_columns": [],
+        "promotion_columns": []
+    },
+    "AAST": {
+        "slug": "TO REPLACE", # AAST board slug
+        "quota_columns": [],
+        "promotion_columns": []
+    }
+}
+DEFAULT_BOARD = "ARD"
+
+# Discord server id -> board key, servers not listed here use DEFAULT_BOARD
+GUILD_BOARDS = {
+    1234567891011121314: "ARD" # placeholder id, to replace
+}
+
+
+class Board:
+    def __init__(self, client, key, slug, quota_columns, promotion_columns=()):
+        self.client = client
+        self.api = client.api
+        self.key = key
+        self.slug = slug
+        self.quota_columns = list(quota_columns)
+        self.promotion_columns = list(promotion_columns)
+        self.story_index = StoryIndex() # Cards in promotion_columns, by subject
+        self.project = None
+        self.story_statuses = []
+        self.task_statuses = []
+        self.cf_definitions = []
+        self.cf_id_to_name = {}
+        self._status_by_name = {}
+        self._status_by_id = {}
+        self._task_status_by_name = {}
+        self.command_lock = asyncio.Lock() # One command at a time per board, different boards run in parallel
+
+    def load(self):
+        if self.slug == "tommy07475-test":
+            ot.warn(f"[{self.key}] RUNNING BOT IN TEST BOARD")
+        elif self.slug == "sevencuts-aegis-research-division-1":
+            ot.info(f"[{self.key}] RUNNING BOT IN OFFICIAL ARD SERVER")
+
+        self.project = self.api.projects.get_by_slug(self.slug)
+        self.refresh_statuses()
+        ot.success(f"[{self.key}] Successfully found the project")
+
+        self.refresh_attributes()
+        ot.success(f"[{self.key}] Successfully identified general custom attributes")
+        return self
+
+    def refresh_statuses(self):
+        self.story_statuses = self.project.list_user_story_statuses()
+        self.task_statuses = self.api.task_statuses.list(project=self.project.id)
+        self._status_by_name = {s.name: s for s in self.story_statuses}
+        self._status_by_id = {s.id: s for s in self.story_statuses}
+        self._task_status_by_name = {s.name: s for s in self.task_statuses}
+
+    def refresh_attributes(self):
+        self.cf_definitions = self.api.user_story_attributes.list(project=self.project.id)
+        self.cf_id_to_name = {str(cf.id): cf.name for cf in self.cf_definitions}
+
+    def get_target_status(self, TARGET_STATUS_VAR):
+        target_status = self._status_by_name.get(TARGET_STATUS_VAR)
+        if not target_status:
+            raise ValueError(ot.error(f"[{self.key}] Status '{TARGET_STATUS_VAR}' not found in the project's story statuses."))
+        return target_status
+
+    def get_status_id(self, sname):
+        s = self._status_by_name.get(sname)
+        return s.id if s else None
+
+    def get_status_from_id(self, sid):
+        s = self._status_by_id.get(sid)
+        return s.name if s else None
+
+    def get_task_status_id(self, sname):
+        s = self._task_status_by_name.get(sname)
+        return s.id if s else None
+
+    def list_stories(self, status_id=None):
+        # Decoded straight into StoryRecords, the full python-taiga objects are never built
+        params = {"project": self.project.id}
+        if status_id is not None:
+            params["status"] = status_id
+        response = self.client.get("userstories", params=params, paginate=False)
+        if response.status_code != 200:
+            raise ValueError(ot.error(f"[{self.key}] Failed to list user stories. Status: {response.status_code}, Body: {response.text}"))
+        return decode_stories(response.json())
+
+    def note_moved(self, story, status_id):
+        # Keeps the /promote index right after a move until the next background refresh
+        if self.get_status_from_id(status_id) in self.promotion_columns:
+            story.status = status_id
+        else:
+            self.story_index.discard(story.subject)
+
+    def refresh_story_index(self):
+        # One listing of the whole board instead of one per column
+        status_ids = {self.get_target_status(name).id for name in self.promotion_columns}
+        stories = [story for story in self.list_stories() if story.status in status_ids]
+        self.story_index.rebuild(stories)
+        ot.info(f"[{self.key}] Indexed {len(stories)} promotable cards")
+        return self.story_index
+
+
+class BoardRegistry:
+    def __init__(self, client, config=BOARDS, guild_boards=GUILD_BOARDS, default=DEFAULT_BOARD):
+        self.client = client
+        self.config = config
+        self.guild_boards = guild_boards
+        self.default = default
+        self._boards = {}
+        self._lock = threading.Lock() # Guards _boards and _loading, never held while talking to Taiga
+        self._loading = {} # key -> lock held by the thread loading that board
+
+    def keys(self):
+        return list(self.config.keys())
+
+    def get(self, key):
+        key = (key or self.default).strip().upper()
+        if key not in self.config:
+            raise KeyError(f"Unknown board '{key}', expected one of: {', '.join(self.config)}")
+
+        board = self._boards.get(key)
+        if board is not None:
+            return board
+
+        # Boards are loaded on first use. Each board has its own loading lock, so two threads never load
+        # the same board twice and a slow load doesn't hold up commands for the other boards
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            board = self._boards.get(key)
+            if board is None:
+                cfg = self.config[key]
+                board = Board(self.client, key, cfg["slug"], cfg["quota_columns"], cfg.get("promotion_columns", ())).load()
+                with self._lock:
+                    self._boards[key] = board
+                    self._loading.pop(key, None)
+            return board
+
+    def loaded(self):
+        with self._lock:
+            return list(self._boards.values())
+
+    def peek(self, key):
+        # The board if it's already loaded, never loads it (for code that can't wait on Taiga)
+        return self._boards.get((key or self.default).strip().upper())
+
+    def for_guild(self, guild_id, key=None):
+        if key:
+            return self.get(key)
+        return self.get(self.guild_boards.get(guild_id, self.default))
@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Record / replay of the bot's HTTP traffic.
+#
+# Every request the bot makes, from python-taiga or our own client, ends up in HTTPAdapter.send,
+# so that's the one place patched here:
+#   Recorder   - lets requests through (to Taiga, or to a FakeTaiga backend) and saves them to a cassette
+#   Replayer   - answers requests from a cassette, a request the cassette doesn't have is an error
+# Both count the requests they see, which is what the request budgets are checked against.
+#
+# Auth tokens are scrubbed before saving. Cassettes recorded on a real board still contain member
+# data, keep those out of git.
+
+SCRUBBED_KEYS = ("auth_token", "refresh")
+
+
+class CassetteMiss(Exception):
+    pass
+
+
+def request_key(method, url):
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query)))
+    return f"{method} {parts.path}" + (f"?{query}" if query else "")
+
+
+def _body_text(body):
+    if body is None:
+        return None
+    return body.decode("utf-8") if isinstance(body, bytes) else body
+
+
+def _scrub(text):
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError):
+        return text
+    if isinstance(data, dict) and any(k in data for k in SCRUBBED_KEYS):
+        data.update({k: "scrubbed" for k in SCRUBBED_KEYS if k in data})
+        return json.dumps(data)
+    return text
+
+
+def build_response(request, status, text, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = text.encode("utf-8") if text is not None else b""
+    response.headers = CaseInsensitiveDict(headers or {"Content-Type": "application/json"})
+    response.encoding = "utf-8"
+    response.url = request.url
+    response.request = request
+    response.reason = "OK" if status < 400 else "Error"
+    return response
+
+
+def fake_transport(fake):
+    # Adapter between HTTPAdapter.send and a FakeTaiga backend
+    def send(request):
+        status, data = fake.handle(request.method, request.url, _body_text(request.body))
+        return build_response(request, status, json.dumps(data) if data is not None else None)
+    return send
+
+
+class _Tap:
+    def __init__(self, send):
+        self.send = send # (request, adapter, **kwargs) -> response
+        self.requests = [] # request keys, in order
+        self.statuses = [] # response status of each request, None if it raised
+        self._lock = threading.Lock()
+        self._original = None
+        self._mark = 0
+
+    def mark(self):
+        # Start counting from here (skips the bot's startup traffic)
+        with self._lock:
+            self._mark = len(self.requests)
+
+    def count(self):
+        with self._lock:
+            return len(self.requests) - self._mark
+
+    def counted(self):
+        with self._lock:
+            return list(self.requests[self._mark:])
+
+    def errors(self):
+        # Requests since the mark that got a 4xx/5xx or no response at all
+        with self._lock:
+            return [(key, status) for key, status in zip(self.requests[self._mark:], self.statuses[self._mark:])
+                    if status is None or status >= 400]
+
+    def __enter__(self):
+        self._original = HTTPAdapter.send
+        tap = self
+
+        def send(adapter, request, **kwargs):
+            with tap._lock:
+                tap.requests.append(request_key(request.method, request.url))
+                index = len(tap.statuses)
+                tap.statuses.append(None)
+            response = tap.send(request, adapter, **kwargs)
+            with tap._lock:
+                tap.statuses[index] = response.status_code
+            return response
+
+        HTTPAdapter.send = send
+        return self
+
+    def __exit__(self, *exc):
+        HTTPAdapter.send = self._original
+        return False
+
+
+class Recorder(_Tap):
+    def __init__(self, path, transport=None):
+        super().__init__(self._record)
+        self.path = path
+        self.transport = transport # None sends to the real network
+        self.interactions = []
+
+    def _record(self, request, adapter, **kwargs):
+        if self.transport:
+            response = self.transport(request)
+        else:
+            response = self._original(adapter, request, **kwargs)
+        with self._lock:
+            self.interactions.append({
+                "request": request_key(request.method, request.url),
+                "body": _body_text(request.body),
+                "status": response.status_code,
+                "headers": {k: v for k, v in response.headers.items() if k.lower().startswith(("content-type", "x-pagination"))},
+                "response": _scrub(response.text)
+            })
+        return response
+
+    def __exit__(self, *exc):
+        super().__exit__(*exc)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"interactions": self.interactions}, f, indent=1)
+        return False
+
+
+class Replayer(_Tap):
+    def __init__(self, path):
+        super().__init__(self._replay)
+        self.path = path
+        self.misses = [] # The bot swallows most exceptions, so misses are kept here as well
+        with open(path, "r", encoding="utf-8") as f:
+            interactions = json.load(f)["interactions"]
+        # Same request twice gets the recorded answers in the order they were recorded
+        self._queues = {}
+        for interaction in interactions:
+            self._queues.setdefault(interaction["request"], []).append(interaction)
+
+    def _replay(self, request, adapter, **kwargs):
+        key = request_key(request.method, request.url)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                self.misses.append(key)
+                raise CassetteMiss(f"'{key}' is not in {self.path} (or was requested more often than recorded)")
+            interaction = queue.pop(0)
+        return build_response(request, interaction["status"], interaction["response"], interaction["headers"])
+
+    def unused(self):
+        with self._lock:
+            return [key for key, queue in self._queues.items() for _ in queue]
@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+from cassette import Recorder, Replayer, fake_transport
+from fake_taiga import FakeTaiga
+
+# Request budgets for the bot's commands.
+#
+# Runs parsequota (normal and dry run), promote and the create_card modal offline against recorded cassettes and fails
+# when a command makes more Taiga requests than its budget in cassettes/budgets.json. A run only counts if it worked:
+# any 4xx/5xx answer, a reply with a failure marker in it, or a missing "expect" reply fails the check as well.
+#
+#   python check_request_budgets.py                  replay every cassette and check the budgets
+#   python check_request_budgets.py record --fake    re-record the cassettes against an in-memory Taiga
+#   python check_request_budgets.py record           re-record against the real board (needs TAIGA_USERNAME/PASSWORD,
+#                                                    writes to cassettes/real/, keep it out of git)
+#
+# When a change is meant to alter the number of requests, re-record and update the budget with it.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BOT_FILE = os.path.join(HERE, "TAAOS - Bot.py")
+CASSETTE_DIR = os.path.join(HERE, "cassettes")
+BUDGETS_FILE = os.path.join(CASSETTE_DIR, "budgets.json")
+QUOTA_DATE = "2026-10-12"
+FAILURE_MARKERS = ("⚠️", "Failed", "failed") # in anything the bot sends back to Discord
+
+
+# === Fake Discord objects, just enough for the commands to run ===
+
+class FakeChannel:
+    def __init__(self, history=()):
+        self._history = list(history)
+        self.sent = []
+
+    async def history(self, limit=None):
+        for content in self._history[:limit]:
+            yield SimpleNamespace(content=content)
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+
+
+class FakeResponse:
+    async def send_message(self, content=None, **kwargs):
+        pass
+
+    async def defer(self, **kwargs):
+        pass
+
+
+class FakeInteraction:
+    def __init__(self):
+        self.guild_id = None
+        self.user = SimpleNamespace(id=1, guild_permissions=SimpleNamespace(administrator=True))
+        self.namespace = SimpleNamespace()
+        self.response = FakeResponse()
+        self.followup = FakeChannel()
+
+    async def edit_original_response(self, **kwargs):
+        pass
+
+
+# === Scenarios ===
+
+def quota_report(stories):
+    return "\n".join(
+        f"Member{i:03d} | Quota: {'Failed' if i % 3 == 0 else 'Passed'} | Activity: {'Low' if i % 3 == 0 else 'High'}"
+        for i in range(stories)
+    )
+
+
+# Each scenario returns every message the bot sent
+
+async def run_parsequota(bot, scenario, dry_run=False):
+    channel = FakeChannel([quota_report(scenario["stories"])])
+    bot.bot.get_channel = lambda channel_id: channel
+    interaction = FakeInteraction()
+    await bot.parse_quota.callback(interaction, QUOTA_DATE, dry_run=dry_run)
+    return channel.sent + interaction.followup.sent
+
+
+async def run_parsequota_dry_run(bot, scenario):
+    return await run_parsequota(bot, scenario, dry_run=True)
+
+
+async def run_promote(bot, scenario):
+    interaction = FakeInteraction()
+    await bot.promote.callback(interaction, "Member001")
+    return interaction.followup.sent
+
+
+async def run_create_card(bot, scenario):
+    modal = bot.CardInfoModal()
+    modal.card_details._value = "Roblox: NewMember\nTaiga: newmember\nTimezone: UTC\nEmail: new@example.com\nContract: Standard"
+    modal.division._value = "ARD"
+    interaction = FakeInteraction()
+    await modal.on_submit(interaction)
+    return interaction.followup.sent
+
+
+SCENARIOS = {
+    "parsequota": run_parsequota,
+    "parsequota_dry_run": run_parsequota_dry_run,
+    "promote": run_promote,
+    "create_card": run_create_card
+}
+
+
+def load_bot():
+    # The bot logs in and loads its board at import time, so it's imported inside the tap every run
+    sys.path.insert(0, HERE)
+    spec = importlib.util.spec_from_file_location("taaos_bot", BOT_FILE)
+    bot = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bot)
+    bot.client.hedge_reads = False # Duplicate reads would make the counts depend on timing
+    return bot
+
+
+def run_scenario(name, scenario, tap):
+    workdir = tempfile.mkdtemp(prefix="taaos-budget-")
+    cwd = os.getcwd()
+    os.chdir(workdir) # strike history and profiles get written here
+    try:
+        with tap:
+            bot = load_bot()
+            tap.mark()
+            sent = asyncio.run(SCENARIOS[name](bot, scenario))
+        return tap.count(), problems(tap, scenario, sent)
+    finally:
+        os.chdir(cwd)
+
+
+def problems(tap, scenario, sent):
+    found = [f"{status or 'no response'} for {key}" for key, status in tap.errors()]
+    sent = [message or "" for message in sent]
+    found += [f"failure in reply: {message.splitlines()[0]}" for message in sent if any(m in message for m in FAILURE_MARKERS)]
+    if scenario.get("expect") and not any(scenario["expect"] in message for message in sent):
+        found.append(f"no reply containing '{scenario['expect']}'")
+    return found
+
+
+def record(budgets, fake):
+    directory = CASSETTE_DIR if fake else os.path.join(CASSETTE_DIR, "real")
+    failed = False
+    for name, scenario in budgets.items():
+        transport = None
+        if fake:
+            os.environ.setdefault("TAIGA_USERNAME", "taaos")
+            os.environ.setdefault("TAIGA_PASSWORD", "fake")
+            from boards import BOARDS, DEFAULT_BOARD
+            transport = fake_transport(FakeTaiga(BOARDS[DEFAULT_BOARD]["slug"], scenario.get("stories", 100)))
+        recorder = Recorder(os.path.join(directory, f"{name}.json"), transport)
+        count, found = run_scenario(name, scenario, recorder)
+        print(f"{name}: recorded {len(recorder.interactions)} requests, {count} made by the command (budget {scenario['max_requests']})")
+        for problem in found:
+            print(f"     {problem}")
+        failed |= bool(found)
+    return 1 if failed else 0
+
+
+def check(budgets):
+    os.environ.setdefault("TAIGA_USERNAME", "taaos")
+    os.environ.setdefault("TAIGA_PASSWORD", "replay")
+    failed = False
+    for name, scenario in budgets.items():
+        replayer = Replayer(os.path.join(CASSETTE_DIR, f"{name}.json"))
+        count, found = run_scenario(name, scenario, replayer)
+        over = count > scenario["max_requests"]
+        ok = not over and not found and not replayer.misses
+        failed |= not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {name}: {count}/{scenario['max_requests']} requests")
+        for key in replayer.misses:
+            print(f"     not in cassette: {key}")
+        for problem in found:
+            print(f"     {problem}")
+        if over:
+            print("     requests made: " + ", ".join(replayer.counted()))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the bot's Taiga request budgets against recorded cassettes.")
+    parser.add_argument("mode", nargs="?", choices=["check", "record"], default="check")
+    parser.add_argument("--fake", action="store_true", help="record against an in-memory Taiga instead of the real board")
+    args = parser.parse_args()
+
+    with open(BUDGETS_FILE, "r", encoding="utf-8") as f:
+        budgets = json.load(f)
+
+    if args.mode == "record":
+        sys.exit(record(budgets, args.fake))
+    else:
+        sys.exit(check(budgets))
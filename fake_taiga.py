@@ -0,0 +1,193 @@
+import json
+import re
+import threading
+from urllib.parse import parse_qsl, urlsplit
+
+# In-memory stand-in for the parts of the Taiga API the bot uses.
+#
+# Only meant for offline runs (cassette recording and request budgets, see check_request_budgets.py):
+# it keeps versions, statuses, tags, tasks and custom attribute values consistent, nothing more.
+
+PROJECT_ID = 1
+STATUSES = [
+    "Assistant Researcher", "Researcher", "Senior Researcher", "Instructor", "Supervisor", "Overwatch",
+    "Discharging Personnel", "Exempted Personnel"
+]
+TASK_STATUSES = ["Incomplete", "Complete"]
+STRIKES = ["0", "1 | 1 Week Inactive", "2 | 2 Weeks Inactive", "3 | 3 Weeks Inactive", "4 | 4 Weeks Inactive"]
+ATTRIBUTES = {
+    "Activity": ["High", "Medium", "Low", "Inactivity Notice"],
+    "Activity Strikes": STRIKES,
+    "Timezone": None,
+    "Divisional Status": ["Personnel", "Trialing"],
+    "Divisional Strikes": ["0", "1", "2", "3"]
+}
+RANK_TAGS = {
+    "Assistant Researcher": "assistant researcher", "Researcher": "researcher", "Senior Researcher": "senior researcher",
+    "Instructor": "instructor", "Supervisor": "supervisor"
+}
+PROGRAMS = { # The program task a card has open while it holds the rank, as in rank_rules.json
+    "Assistant Researcher": "Education Program", "Researcher": "Researcher Advancement Program",
+    "Senior Researcher": "Instructor Training Program"
+}
+
+
+class FakeTaiga:
+    def __init__(self, slug, stories=100):
+        self._lock = threading.Lock()
+        self.slug = slug
+        self.statuses = [{"id": 10 + i, "name": name, "project": PROJECT_ID, "order": i} for i, name in enumerate(STATUSES)]
+        self.task_statuses = [{"id": 100 + i, "name": name, "project": PROJECT_ID} for i, name in enumerate(TASK_STATUSES)]
+        self.attributes = [
+            {"id": 200 + i, "name": name, "project": PROJECT_ID, "type": "dropdown" if extra else "text", "extra": extra}
+            for i, (name, extra) in enumerate(ATTRIBUTES.items())
+        ]
+        self.project = {
+            "id": PROJECT_ID, "name": "Fake Board", "slug": slug,
+            "tags": [[tag, "#70728F"] for tag in RANK_TAGS.values()] + [["discharging personnel", "#E44057"]]
+        }
+        self.stories = {}
+        self.values = {}
+        self.tasks = {}
+        self._next_id = 1000
+        for i in range(stories):
+            status = STATUSES[i % 5]
+            strikes = STRIKES[i % 4]
+            story = self._new_story(f"Member{i:03d}", self._status_id(status), [[RANK_TAGS[status], None]])
+            self.values[story["id"]]["attributes_values"] = {
+                str(self._attribute_id("Activity")): "High",
+                str(self._attribute_id("Activity Strikes")): strikes
+            }
+            self._new_task(story["id"], f"Current Rank: {status}")
+            if status in PROGRAMS:
+                self._new_task(story["id"], PROGRAMS[status])
+
+    # === helpers ===
+
+    def _id(self):
+        self._next_id += 1
+        return self._next_id
+
+    def _status_id(self, name):
+        return next(s["id"] for s in self.statuses if s["name"] == name)
+
+    def _attribute_id(self, name):
+        return next(a["id"] for a in self.attributes if a["name"] == name)
+
+    def _new_story(self, subject, status, tags=None, description=""):
+        story = {
+            "id": self._id(), "ref": len(self.stories) + 1, "subject": subject, "status": status, "version": 1,
+            "tags": tags or [], "project": PROJECT_ID, "description": description, "is_closed": False
+        }
+        self.stories[story["id"]] = story
+        self.values[story["id"]] = {"attributes_values": {}, "version": 1, "user_story": story["id"]}
+        return story
+
+    def _new_task(self, story_id, subject, status=None):
+        task = {
+            "id": self._id(), "subject": subject, "status": status or self.task_statuses[0]["id"], "version": 1,
+            "user_story": story_id, "project": PROJECT_ID
+        }
+        self.tasks[task["id"]] = task
+        return task
+
+    @staticmethod
+    def _patch(target, body, fields):
+        if body.get("version") != target["version"]:
+            return 400, {"version": "The version doesn't match with the current one"}
+        for field in fields:
+            if field in body:
+                target[field] = body[field]
+        target["version"] += 1
+        return 200, target
+
+    # === routing ===
+
+    def handle(self, method, url, body):
+        parts = urlsplit(url)
+        path = parts.path.split("/api/v1/", 1)[-1].strip("/")
+        query = dict(parse_qsl(parts.query))
+        body = json.loads(body) if body else {}
+        with self._lock:
+            return self._route(method, path, query, body)
+
+    def _route(self, method, path, query, body):
+        if method == "POST" and path == "auth":
+            return 200, {"auth_token": "fake-token", "refresh": "fake-refresh", "id": 1, "username": "taaos"}
+
+        if method == "GET" and path == "projects/by_slug":
+            return (200, self.project) if query.get("slug") == self.slug else (404, {"_error_message": "Not found."})
+        if method == "GET" and path == f"projects/{PROJECT_ID}":
+            return 200, self.project
+        if method == "GET" and path == "userstory-statuses":
+            return 200, self.statuses
+        if method == "GET" and path == "task-statuses":
+            return 200, self.task_statuses
+        if method == "GET" and path == "userstory-custom-attributes":
+            return 200, self.attributes
+
+        if path == "userstories":
+            if method == "GET":
+                stories = list(self.stories.values())
+                if "status" in query:
+                    stories = [s for s in stories if s["status"] == int(query["status"])]
+                return 200, stories
+            if method == "POST":
+                status = body.get("status") or self._status_id("Assistant Researcher")
+                return 201, self._new_story(body["subject"], status, description=body.get("description", ""))
+
+        if method == "POST" and path == "userstories/bulk_update_kanban_order":
+            moved = []
+            for story_id in body["bulk_userstories"]:
+                story = self.stories[story_id]
+                story["status"] = body["status_id"]
+                story["version"] += 1
+                moved.append({"id": story_id, "status": story["status"], "swimlane": None, "kanban_order": story["version"]})
+            return 200, moved
+
+        m = re.fullmatch(r"userstories/custom-attributes-values/(\d+)", path)
+        if m:
+            values = self.values.get(int(m.group(1)))
+            if values is None:
+                return 404, {"_error_message": "Not found."}
+            if method == "GET":
+                return 200, values
+            return self._patch(values, body, ["attributes_values"])
+
+        m = re.fullmatch(r"userstories/(\d+)", path)
+        if m:
+            story = self.stories.get(int(m.group(1)))
+            if story is None:
+                return 404, {"_error_message": "Not found."}
+            if method == "GET":
+                return 200, story
+            if method == "PATCH":
+                return self._patch(story, body, ["status", "tags", "subject", "description"]) # comments are only stored by version
+
+        if path == "tasks":
+            if method == "GET":
+                tasks = [t for t in self.tasks.values() if t["project"] == int(query.get("project", PROJECT_ID))]
+                if "user_story" in query:
+                    tasks = [t for t in tasks if t["user_story"] == int(query["user_story"])]
+                return 200, tasks
+            if method == "POST":
+                return 201, self._new_task(body["user_story"], body["subject"], body.get("status"))
+
+        if method == "POST" and path == "tasks/bulk_create":
+            created = [self._new_task(body["us_id"], subject, body.get("status_id")) for subject in body["bulk_tasks"].split("\n") if subject]
+            return 200, created
+
+        m = re.fullmatch(r"tasks/(\d+)", path)
+        if m:
+            task = self.tasks.get(int(m.group(1)))
+            if task is None:
+                return 404, {"_error_message": "Not found."}
+            if method == "GET":
+                return 200, task
+            if method == "PATCH":
+                return self._patch(task, body, ["subject", "status"])
+            if method == "DELETE":
+                del self.tasks[task["id"]]
+                return 204, None
+
+        return 404, {"_error_message": f"Fake Taiga doesn't know {method} {path}"}
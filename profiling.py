@@ -0,0 +1,113 @@
+import cProfile
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# On demand profiling of slash commands.
+#
+# An admin arms a command with /profile, the next N runs of that command get a CommandProfile
+# instead of a NullProfile. Commands time their phases with "with prof.phase(...)" and run their
+# blocking Taiga work through prof.call(), which profiles it with cProfile in the worker thread.
+# When the command ends the runs are merged into one .pstats file (open it with snakeviz, or turn it
+# into a flamegraph with flameprof) next to a text summary of the phases and top hotspots.
+
+PROFILE_DIR = "profiles" # Relative to the working directory of the bot
+TOP_HOTSPOTS = 10 # Functions listed in the summary sent to the admin
+
+
+class NullProfile:
+    enabled = False
+
+    def call(self, fn, *args):
+        return fn(*args)
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+
+class CommandProfile:
+    enabled = True
+
+    def __init__(self, command, admin_id):
+        self.command = command
+        self.admin_id = admin_id
+        self.started = time.perf_counter()
+        self.phases = {} # name -> [seconds, times entered]
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def call(self, fn, *args):
+        # A Profile only sees the thread it runs in, so every worker call gets its own and they're merged at the end
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(fn, *args)
+        finally:
+            with self._lock:
+                self._profiles.append(profile)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                entry = self.phases.setdefault(name, [0.0, 0])
+                entry[0] += elapsed
+                entry[1] += 1
+
+    def finish(self, path=PROFILE_DIR):
+        # Writes the .pstats and summary files, returns (summary, pstats path or None)
+        total = time.perf_counter() - self.started
+        os.makedirs(path, exist_ok=True)
+        base = os.path.join(path, f"{self.command}_{time.strftime('%Y%m%d-%H%M%S')}")
+
+        lines = [f"**Profile of /{self.command}** ({total:.2f}s wall time)", "", "Phases:"]
+        for name, (seconds, count) in sorted(self.phases.items(), key=lambda p: -p[1][0]):
+            percent = seconds * 100 / total if total else 0
+            lines.append(f"{name}: {seconds:.2f}s ({percent:.0f}%) over {count} run(s)")
+
+        stats_path = None
+        if self._profiles:
+            stats = pstats.Stats(self._profiles[0])
+            for profile in self._profiles[1:]:
+                stats.add(profile)
+            stats_path = base + ".pstats"
+            stats.dump_stats(stats_path)
+
+            lines += ["", f"Top {TOP_HOTSPOTS} hotspots (own time, worker threads):"]
+            hotspots = sorted(stats.stats.items(), key=lambda s: -s[1][2])[:TOP_HOTSPOTS]
+            for (filename, line, func), (_, calls, own, cumulative, _) in hotspots:
+                lines.append(f"{func} ({os.path.basename(filename)}:{line}): {own:.3f}s own, {cumulative:.3f}s cumulative, {calls} calls")
+
+        summary = "\n".join(lines)
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(summary)
+        return summary, stats_path
+
+
+class ProfileManager:
+    def __init__(self):
+        self._armed = {} # command -> [runs left, admin id]
+        self._lock = threading.Lock()
+
+    def arm(self, command, runs, admin_id):
+        with self._lock:
+            if runs > 0:
+                self._armed[command] = [runs, admin_id]
+            else:
+                self._armed.pop(command, None)
+
+    def take(self, command):
+        with self._lock:
+            armed = self._armed.get(command)
+            if not armed:
+                return NullProfile()
+            armed[0] -= 1
+            if armed[0] <= 0:
+                del self._armed[command]
+            return CommandProfile(command, armed[1])
@@ -0,0 +1,122 @@
+import io
+import time
+import discord
+import output as ot
+
+# Progress reporting for long running slash commands.
+#
+# Discord only lets a bot edit a message a handful of times every few seconds before it starts
+# rate limiting, so the reporter keeps track of when it last edited the status message and skips
+# any update that comes in sooner than MIN_EDIT_INTERVAL. The last state is always flushed by finish().
+
+DISCORD_MESSAGE_LIMIT = 2000 # Hard limit of characters in a single Discord message
+MIN_EDIT_INTERVAL = 1.5 # Seconds between two edits of the status message
+MAX_REPORT_CHUNKS = 3 # Reports that need more messages than this get attached as a file instead
+
+
+def format_duration(seconds):
+    seconds = int(max(seconds, 0))
+    minutes, seconds = divmod(seconds, 60)
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
+class ProgressReporter:
+    def __init__(self, interaction, total, title="Running quota match", min_interval=MIN_EDIT_INTERVAL):
+        self.interaction = interaction
+        self.total = total
+        self.title = title
+        self.min_interval = min_interval
+        self.processed = 0
+        self.stage = None
+        self.started_at = time.monotonic()
+        self.last_edit = 0.0
+        self.enabled = True # Turned off if the interaction token expires (15 minutes) or the message is gone
+
+    def render(self):
+        elapsed = time.monotonic() - self.started_at
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.total - self.processed, 0)
+
+        lines = [f"⏳ {self.title}..."]
+        if self.stage:
+            lines.append(f"Stage: {self.stage}")
+        if self.total:
+            percent = self.processed * 100 // self.total
+            lines.append(f"Processed: {self.processed}/{self.total} ({percent}%)")
+        else:
+            lines.append(f"Processed: {self.processed}")
+        lines.append(f"Rate: {rate:.2f} users/s")
+        if rate > 0 and remaining:
+            lines.append(f"ETA: {format_duration(remaining / rate)}")
+        lines.append(f"Elapsed: {format_duration(elapsed)}")
+        return "\n".join(lines)
+
+    async def _edit(self, content):
+        if not self.enabled:
+            return
+        try:
+            await self.interaction.edit_original_response(content=content)
+        except discord.HTTPException as e:
+            ot.warn(f"Could not update progress message, disabling further updates: {e}")
+            self.enabled = False
+        self.last_edit = time.monotonic()
+
+    async def start(self, stage=None):
+        self.stage = stage
+        await self._edit(self.render())
+
+    async def update(self, processed=None, stage=None, force=False):
+        if processed is not None:
+            self.processed = processed
+        if stage is not None:
+            self.stage = stage
+        if not force and time.monotonic() - self.last_edit < self.min_interval:
+            return
+        await self._edit(self.render())
+
+    async def finish(self, text=None):
+        elapsed = format_duration(time.monotonic() - self.started_at)
+        if text is None:
+            text = f"✅ {self.title} complete: {self.processed}/{self.total} processed in {elapsed}."
+        await self._edit(text)
+
+
+def split_message(text, limit=DISCORD_MESSAGE_LIMIT):
+    # Splits on line boundaries where possible, lines longer than the limit get hard split
+    chunks = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        candidate = line if not current else current + "\n" + line
+        if len(candidate) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def send_long_message(channel, text, filename="report.txt", max_chunks=MAX_REPORT_CHUNKS, **kwargs):
+    # kwargs go to every send, e.g. ephemeral=True when channel is an interaction's followup
+    if len(text) <= DISCORD_MESSAGE_LIMIT:
+        await channel.send(text, **kwargs)
+        return
+
+    chunks = split_message(text)
+    if len(chunks) <= max_chunks:
+        for chunk in chunks:
+            await channel.send(chunk, **kwargs)
+        return
+
+    header = text.split("\n", 1)[0]
+    file = discord.File(io.BytesIO(text.encode("utf-8")), filename=filename)
+    await channel.send(f"{header}\nReport too long for Discord ({len(text)} characters), see the attached file.", file=file, **kwargs)
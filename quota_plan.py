@@ -0,0 +1,182 @@
+from datetime import timedelta
+
+# Planning for /parsequota.
+#
+# The quota report is matched against one listing of the board, and together with the custom
+# attribute values of the matched cards that gives everything a run is going to write. For every
+# matched card the plan holds the attribute values that actually change, its strikes before and
+# after, and the review comment. Report names without a card and cards without a report row end up
+# in the plan as well. Nothing in here talks to Taiga: a dry run shows the plan, a normal run
+# writes exactly what is in it.
+
+INACTIVITY_NOTICE = "Inactivity Notice" # Cards on notice get their review comment, their values are left alone
+ACTIVITY_FIELD = "Activity"
+COMMENT_TITLE = "**\\[L-2\\] Researcher Performance Review**"
+
+
+def parse_report(text):
+    # "(Name) | Quota: (Value) | Activity: (Value)" rows, malformed lines are skipped
+    rows = []
+    for line in text.strip().split("\n"):
+        try:
+            parts = [p.strip() for p in line.split("|")]
+            rows.append((parts[0], parts[1].split(":")[1].strip(), parts[2].split(":")[1].strip()))
+        except (IndexError, ValueError):
+            continue
+    return rows
+
+
+def match_rows(board, rows, stories):
+    # Cards are matched column by column in quota_columns order, each row and each card at most once
+    pending = {}
+    for row in rows:
+        pending.setdefault(row[0], []).append(row)
+
+    matches = [] # (story, row)
+    unmatched_cards = []
+    for status_name in board.quota_columns:
+        status_id = board.get_status_id(status_name)
+        for story in stories:
+            if story.status != status_id:
+                continue
+            if pending.get(story.subject):
+                matches.append((story, pending[story.subject].pop(0)))
+            else:
+                unmatched_cards.append(story.subject)
+
+    matched = {id(row) for _, row in matches}
+    unmatched_rows = [row[0] for row in rows if id(row) not in matched]
+    return matches, unmatched_rows, unmatched_cards
+
+
+class CardPlan:
+    __slots__ = ("story", "quota", "activity", "values", "values_version", "changes", "strikes_before",
+                 "strikes_after", "comment", "discharge_due", "discharge_held", "problems")
+
+    def __init__(self, story, quota, activity, values, values_version):
+        self.story = story
+        self.quota = quota
+        self.activity = activity
+        self.values = values # custom attribute values from the snapshot, attribute id -> value
+        self.values_version = values_version
+        self.changes = {} # attribute id -> (attribute name, old value, new value), only real changes
+        self.strikes_before = self.strikes_after = 0
+        self.comment = None
+        self.discharge_due = False
+        self.discharge_held = None # why a due card is left out of auto discharge
+        self.problems = []
+
+    def new_values(self):
+        return {**self.values, **{cf_id: new for cf_id, (_, _, new) in self.changes.items()}}
+
+    def describe(self):
+        changes = ", ".join(f"{name} {old or '-'} → {new}" for name, old, new in self.changes.values())
+        return f"{self.story.subject}: {changes or 'comment only'}"
+
+
+class QuotaPlan:
+    def __init__(self, week, cards, unmatched_rows, unmatched_cards, problems):
+        self.week = week
+        self.cards = cards
+        self.unmatched_rows = unmatched_rows
+        self.unmatched_cards = unmatched_cards
+        self.problems = problems # (name, problem)
+
+    @property
+    def discharge_candidates(self):
+        return [card.story for card in self.cards if card.discharge_due and not card.discharge_held]
+
+    @property
+    def discharge_held(self):
+        return [(card.story, card.discharge_held) for card in self.cards if card.discharge_due and card.discharge_held]
+
+    @property
+    def writes(self):
+        # One attributes PATCH for each card with changes, one comment PATCH for every card
+        return sum(1 for card in self.cards if card.changes) + len(self.cards)
+
+    def summary(self, board_key, rules, auto_discharge=False):
+        changed = [card for card in self.cards if card.changes]
+        lines = [
+            f"Quota Plan ({board_key}) for {self.week} - {self.week + timedelta(days=7)}, dry run, nothing was written:",
+            f"{len(self.cards)} cards matched, {len(changed)} with attribute changes, {len(self.cards)} comments ({self.writes} writes)"
+        ]
+        lines += [card.describe() for card in changed]
+        due = [card.story.subject for card in self.cards if card.discharge_due]
+        if due:
+            lines.append(f"Would reach {rules.discharge_at} activity strikes: " + ", ".join(due))
+            if auto_discharge and self.discharge_candidates:
+                lines.append(f"Would be moved to {rules.discharge_status}: " + ", ".join(s.subject for s in self.discharge_candidates))
+            if auto_discharge:
+                lines += [f"Would not be moved, {reason}: {story.subject}" for story, reason in self.discharge_held]
+        for name in self.unmatched_rows:
+            lines.append(f"Couldn't find any matches for {name} [GOOGLE]")
+        if self.unmatched_cards:
+            lines.append(f"Not in the report: {len(self.unmatched_cards)} cards in the quota columns")
+        for name, problem in self.problems:
+            lines.append(f"⚠️ {name}: {problem}")
+        return "\n".join(lines)
+
+
+def _options(cf):
+    options = cf.extra.get("choices") if isinstance(cf.extra, dict) else cf.extra
+    if not isinstance(options, list):
+        return None
+    return [opt["name"] if isinstance(opt, dict) else opt for opt in options]
+
+
+def _set(card, cf, value):
+    # Records a change only if the value is valid for the field and differs from the snapshot
+    options = _options(cf)
+    if options is not None:
+        option = next((opt for opt in options if opt.lower() == str(value).lower()), None)
+        if option is None:
+            card.problems.append(f"'{value}' is not a valid {cf.name}")
+            return
+        value = option
+    old = card.values.get(str(cf.id))
+    if old is None or str(old).lower() != str(value).lower():
+        card.changes[str(cf.id)] = (cf.name, old, value)
+
+
+def plan_quota(board, rules, week, matched, attributes):
+    # matched is what match_rows returned, attributes maps story id -> custom attribute values payload
+    matches, unmatched_rows, unmatched_cards = matched
+    fields = {cf.name.lower(): cf for cf in board.cf_definitions}
+    activity_cf = fields.get(ACTIVITY_FIELD.lower())
+    strike_cf = fields.get(rules.strike_field.lower())
+    cards = []
+    problems = []
+
+    for story, (name, quota, activity) in matches:
+        payload = attributes.get(story.id) or {}
+        values = dict(payload.get("attributes_values") or {})
+        card = CardPlan(story, quota, activity, values, payload.get("version"))
+
+        card.strikes_before = card.strikes_after = rules.strike_level(values.get(str(strike_cf.id)) if strike_cf else None)
+        on_notice = activity_cf is not None and values.get(str(activity_cf.id)) == INACTIVITY_NOTICE
+
+        if not activity_cf or not strike_cf:
+            card.problems.append(f"custom field '{ACTIVITY_FIELD if not activity_cf else rules.strike_field}' not found")
+        elif not on_notice:
+            if quota == "Failed":
+                _set(card, strike_cf, rules.next_strike(card.strikes_before))
+                if str(strike_cf.id) in card.changes:
+                    card.strikes_after = rules.strike_level(card.changes[str(strike_cf.id)][2])
+            _set(card, activity_cf, activity)
+
+        review = f"{COMMENT_TITLE}\n\n{week} - {week + timedelta(days=7)}\nPR Review: {quota}\n"
+        if quota == "Failed":
+            card.comment = review + f"Activity Strikes: {card.strikes_before} -> {card.strikes_after}"
+        else:
+            card.comment = review + f"Activity: {activity}"
+        card.discharge_due = card.strikes_after >= rules.discharge_at
+        if board.get_status_from_id(story.status) in rules.discharge_exempt:
+            card.discharge_held = "exempted"
+        elif on_notice:
+            card.discharge_held = f"on {INACTIVITY_NOTICE}"
+
+        problems += [(story.subject, problem) for problem in card.problems]
+        cards.append(card)
+
+    return QuotaPlan(week, cards, unmatched_rows, unmatched_cards, problems)
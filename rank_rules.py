@@ -0,0 +1,80 @@
+import json
+import os
+
+# Rank ladder and activity strike rules.
+#
+# rank_rules.json holds the ladder (the tags and program task that come with each rank), the strike
+# levels and what happens on discharge. It's read once at startup and compiled into lookup tables,
+# so /promote, /promote_batch and parsequota look things up instead of branching on names:
+#   promotions     current rank -> Promotion (next rank and every change to make on the card)
+#   strike levels  "2 | 2 Weeks Inactive" -> 2, and 2 -> "3 | 3 Weeks Inactive" for the next strike
+#
+# Promoting from one rank to the next renames the "Current Rank" task, completes the old rank's
+# program, creates the new rank's program and swaps the rank tags. Promoting into a rank marked
+# "status_only" only moves the card to its column, tasks and tags are left as they are.
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rank_rules.json")
+
+
+class Promotion:
+    __slots__ = ("current", "target", "status_only", "rename_task", "complete_task", "create_task", "remove_tags", "add_tags")
+
+    def __init__(self, current, target, rank_task):
+        self.current = current["name"]
+        self.target = target["name"]
+        self.status_only = bool(target.get("status_only"))
+        if self.status_only:
+            self.rename_task = self.complete_task = self.create_task = None
+            self.remove_tags = self.add_tags = []
+            return
+        self.rename_task = (rank_task.format(rank=self.current), rank_task.format(rank=self.target))
+        self.complete_task = current.get("program")
+        self.create_task = target.get("program")
+        self.remove_tags = [t.lower() for t in current.get("tags", [])]
+        self.add_tags = [t.lower() for t in target.get("tags", [])]
+
+
+class RankRules:
+    def __init__(self, config):
+        ranks = config["ranks"]
+        names = [r["name"] for r in ranks]
+        if len(set(names)) != len(names):
+            raise ValueError("A rank is listed twice in the rank rules.")
+        self.ranks = names
+
+        self.promotions = {}
+        for current, target in zip(ranks, ranks[1:]):
+            self.promotions[current["name"]] = Promotion(current, target, config["rank_task"])
+
+        strikes = config["strikes"]
+        self.strike_field = strikes["field"]
+        self.strike_levels = list(strikes["levels"])
+        self._strike_level = {label: level for level, label in enumerate(self.strike_levels)}
+        self.discharge_at = strikes["discharge_at"]
+        if not 0 < self.discharge_at < len(self.strike_levels):
+            raise ValueError(f"discharge_at must be one of the strike levels (1-{len(self.strike_levels) - 1}).")
+
+        discharge = config["discharge"]
+        self.discharge_status = discharge["status"]
+        self.discharge_tag = discharge["tag"].lower()
+        self.discharge_task = discharge["task"]
+        self.discharge_exempt = set(discharge.get("exempt_statuses", [])) # Listed when due, never moved automatically
+        # Every rank tag comes off on discharge
+        self.rank_tags = {t.lower() for r in ranks for t in r.get("tags", [])} | {t.lower() for t in discharge.get("remove_tags", [])}
+
+    def strike_level(self, value):
+        # Empty or unknown values count as no strikes
+        return self._strike_level.get(value, 0)
+
+    def next_strike(self, level):
+        # Stays at the top level, the card is up for discharge by then anyway
+        return self.strike_levels[min(level + 1, len(self.strike_levels) - 1)]
+
+
+def load_rules(path=RULES_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    try:
+        return RankRules(config)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid rank rules in {path}: {e!r}")
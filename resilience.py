@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+import output as ot
+
+# Circuit breakers and hedged reads for the Taiga API.
+#
+# Each endpoint ("GET userstories/{id}", "PATCH tasks/{id}", ...) gets its own breaker. After
+# FAILURE_THRESHOLD failures in a row (timeouts, connection errors, 5xx, 429) the breaker opens and
+# every call to that endpoint fails straight away with TaigaDegraded instead of waiting on Taiga.
+# After RESET_TIMEOUT seconds a single probe call is let through (every other call keeps failing
+# fast meanwhile), its success closes the breaker, its failure opens it again.
+#
+# Reads are hedged: once an endpoint has enough latency samples, a GET that takes longer than the
+# endpoint's HEDGE_PERCENTILE latency is sent a second time and whichever answer comes first wins.
+# The losing request can't be cancelled and runs until it's answered or times out, so only
+# MAX_HEDGES duplicate requests are allowed out at once, past that slow reads are simply waited on.
+
+FAILURE_THRESHOLD = 5 # Failures in a row before an endpoint is considered down
+RESET_TIMEOUT = 30.0 # Seconds an open breaker fails fast before trying the endpoint again
+LATENCY_SAMPLES = 200 # Latencies remembered per endpoint
+HEDGE_PERCENTILE = 95 # A read slower than this percentile of its endpoint gets a second request
+HEDGE_MIN_SAMPLES = 20 # Don't hedge before we know what normal looks like for the endpoint
+HEDGE_MIN_DELAY = 0.25 # Never hedge sooner than this many seconds
+MAX_HEDGES = 4 # Duplicate reads out at the same time, keeps hedging from piling load on a slow Taiga
+
+
+class TaigaDegraded(Exception):
+    def __init__(self, endpoint, retry_in):
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+        super().__init__(f"Taiga degraded: '{endpoint}' keeps failing, calls to it are paused for another {retry_in:.0f}s")
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return
+            now = time.monotonic()
+            if self.state == "open":
+                remaining = self.opened_at + self.reset_timeout - now
+                if remaining > 0:
+                    raise TaigaDegraded(self.name, remaining)
+                ot.warn(f"Retrying '{self.name}' after {self.reset_timeout:.0f}s of failing fast.")
+            else:
+                # Half-open: one probe at a time, another one only if the last never reported back
+                remaining = self.probe_started + self.reset_timeout - now
+                if remaining > 0:
+                    raise TaigaDegraded(self.name, remaining)
+            self.state = "half-open"
+            self.probe_started = now
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                ot.success(f"'{self.name}' recovered, circuit closed.")
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                ot.error(f"'{self.name}' failed {self.failures} times in a row, failing fast for {self.reset_timeout:.0f}s.")
+
+
+class LatencyTracker:
+    def __init__(self, size=LATENCY_SAMPLES):
+        self.samples = deque(maxlen=size)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, p):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def hedge_delay(self, p=HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES):
+        if len(self.samples) < min_samples:
+            return None
+        return max(self.percentile(p), HEDGE_MIN_DELAY)
+
+
+def hedged(fn, delay, pool, slots):
+    # Runs fn, and runs it a second time if the first call isn't back after delay seconds and one of
+    # the hedge slots (a semaphore) is free. Returns the first successful result, raises the first
+    # call's error if both fail.
+    first = pool.submit(fn)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result()
+    # Still queued means the pool is busy, not that Taiga is slow, a duplicate would only queue too
+    if not first.running() or not slots.acquire(blocking=False):
+        return first.result()
+
+    second = pool.submit(fn)
+    second.add_done_callback(lambda f: slots.release())
+    pending = {first, second}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for f in done:
+            if f.exception() is None:
+                return f.result()
+    return first.result()
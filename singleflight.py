@@ -0,0 +1,142 @@
+import threading
+import weakref
+from concurrent.futures import Future
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# Coalescing of duplicate Taiga reads.
+#
+# SingleFlight: when several threads ask for the exact same GET at the same time, only the first
+# one goes to Taiga, the others wait for it and share its response.
+#
+# ReadScope: inside "with read_scope():" a thread reuses the responses of reads it already made,
+# so process_user can look at the same story several times for one request. Cached reads are
+# tracked per resource (e.g. ("userstories", 123)); as soon as anything writes to that resource,
+# which bumps the story's version on Taiga, its cached reads are dropped from every open scope. A
+# write to the collection itself (a bulk endpoint) drops every cached read of that collection.
+# Writes still send the version Taiga last returned, so an edit made outside the bot during a
+# scope ends in a version conflict from Taiga rather than a stale write.
+
+
+def resource_of(url):
+    # ".../api/v1/userstories/custom-attributes-values/123" -> ("userstories", 123)
+    # ".../api/v1/userstories?project=1" -> ("userstories", None)
+    parts = urlsplit(url).path.strip("/").split("/")
+    if parts[:2] == ["api", "v1"]:
+        parts = parts[2:]
+    ids = [p for p in parts if p.isdigit()]
+    return (parts[0] if parts else "", int(ids[-1]) if ids else None)
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class ReadScope:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._responses = {} # read key -> response
+        self._keys_by_resource = {} # (collection, id) -> read keys
+
+    def get(self, key):
+        with self._lock:
+            return self._responses.get(key)
+
+    def put(self, key, resource, response):
+        with self._lock:
+            self._responses[key] = response
+            self._keys_by_resource.setdefault(resource, set()).add(key)
+
+    def invalidate(self, resource):
+        collection, resource_id = resource
+        with self._lock:
+            if resource_id is None:
+                # A collection-level write (bulk_update_kanban_order, bulk_create...) can touch any
+                # item of the collection, so every cached read in it goes
+                stale = [r for r in self._keys_by_resource if r[0] == collection]
+            else:
+                # A write to one story also makes the listings of its collection stale
+                stale = [resource, (collection, None)]
+            for r in stale:
+                for key in self._keys_by_resource.pop(r, ()):
+                    self._responses.pop(key, None)
+
+
+class ReadCoalescer:
+    def __init__(self):
+        self.flights = SingleFlight()
+        self._local = threading.local()
+        self._scopes = weakref.WeakSet() # Every open scope, writes have to invalidate all of them
+        self._scopes_lock = threading.Lock()
+        self._generations = {} # resource -> number of writes seen, part of the single-flight key
+        self._generations_lock = threading.Lock()
+
+    @contextmanager
+    def scope(self):
+        # Nested scopes reuse the outer one
+        if getattr(self._local, "scope", None) is not None:
+            yield self._local.scope
+            return
+        scope = ReadScope()
+        with self._scopes_lock:
+            self._scopes.add(scope)
+        self._local.scope = scope
+        try:
+            yield scope
+        finally:
+            self._local.scope = None
+            with self._scopes_lock:
+                self._scopes.discard(scope)
+
+    def read(self, url, kwargs, fetch):
+        resource = resource_of(url)
+        headers = {k.lower(): v for k, v in (kwargs.get("headers") or {}).items() if k.lower() != "authorization"}
+        params = kwargs.get("params") or {}
+        with self._generations_lock:
+            # A read started before a write must not be shared with reads made after it
+            generation = self._generations.get(resource, 0), self._generations.get((resource[0], None), 0)
+        key = (url, tuple(sorted(params.items())), tuple(sorted(headers.items())), generation)
+
+        scope = getattr(self._local, "scope", None)
+        if scope is not None:
+            cached = scope.get(key)
+            if cached is not None:
+                return cached
+
+        response = self.flights.do(key, fetch)
+        if scope is not None and response.status_code == 200:
+            scope.put(key, resource, response)
+        return response
+
+    def wrote(self, url):
+        resource = resource_of(url)
+        with self._generations_lock:
+            for r in {resource, (resource[0], None)}:
+                self._generations[r] = self._generations.get(r, 0) + 1
+        with self._scopes_lock:
+            scopes = list(self._scopes)
+        for scope in scopes:
+            scope.invalidate(resource)
@@ -0,0 +1,91 @@
+import threading
+import time
+from bisect import bisect_left
+
+# In-memory index of card subjects, used for /promote autocomplete and lookups.
+#
+# Exact lookups are a dict hit. Suggestions first take names starting with what was typed (binary
+# search in the sorted names), then fill up with names sharing the most trigrams with it, so
+# "reserch" still finds "Researcher". Nothing here talks to Taiga, the bot rebuilds the index in
+# the background from one board listing.
+
+MAX_SUGGESTIONS = 25 # Discord shows at most 25 autocomplete choices
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class StoryIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_subject = {} # casefolded subject -> story
+        self._names = [] # sorted casefolded subjects
+        self._trigrams = {} # trigram -> casefolded subjects containing it
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._by_subject)
+
+    def rebuild(self, stories):
+        by_subject = {}
+        grams = {}
+        for story in stories:
+            folded = story.subject.casefold()
+            by_subject[folded] = story
+            for gram in trigrams(folded):
+                grams.setdefault(gram, set()).add(folded)
+        with self._lock:
+            self._by_subject = by_subject
+            self._names = sorted(by_subject)
+            self._trigrams = grams
+            self.built_at = time.monotonic()
+
+    def get(self, subject):
+        return self._by_subject.get(subject.strip().casefold())
+
+    def discard(self, subject):
+        # Copies instead of changing in place, suggest() may be reading the current ones without the lock
+        folded = subject.strip().casefold()
+        with self._lock:
+            if folded not in self._by_subject:
+                return
+            by_subject = dict(self._by_subject)
+            del by_subject[folded]
+            grams = dict(self._trigrams)
+            for gram in trigrams(folded):
+                if gram in grams:
+                    grams[gram] = grams[gram] - {folded}
+            self._by_subject = by_subject
+            self._names = [n for n in self._names if n != folded]
+            self._trigrams = grams
+
+    def suggest(self, text, limit=MAX_SUGGESTIONS):
+        query = text.strip().casefold()
+        with self._lock:
+            names, by_subject, grams = self._names, self._by_subject, self._trigrams
+
+        if not query:
+            return [by_subject[n].subject for n in names[:limit]]
+
+        found = []
+        i = bisect_left(names, query)
+        while i < len(names) and len(found) < limit and names[i].startswith(query):
+            found.append(names[i])
+            i += 1
+
+        if len(found) < limit:
+            scores = {}
+            for gram in trigrams(query):
+                for name in grams.get(gram, ()):
+                    scores[name] = scores.get(name, 0) + 1
+            seen = set(found)
+            minimum = 1 if len(query) < 4 else 2 # Short queries only have a couple of trigrams to match on
+            for name in sorted(scores, key=lambda n: (-scores[n], n)):
+                if len(found) >= limit or scores[name] < minimum:
+                    break
+                if name not in seen:
+                    found.append(name)
+
+        return [by_subject[n].subject for n in found]
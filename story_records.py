@@ -0,0 +1,37 @@
+# Compact user story records.
+#
+# A python-taiga UserStory keeps every field of the Taiga payload in its __dict__ (owner and project
+# extra info, points, watchers, order fields, ...) plus a reference to the requester, and listings
+# build one for every card on the board. StoryRecord keeps only what the bot reads, in __slots__,
+# so a board snapshot costs a fraction of the memory (see bench_story_records.py).
+#
+# Custom attribute values are not part of Taiga's listing payload, they are read per story with
+# get_story_attributes in the bot (through the coalesced client, so repeated reads are shared).
+
+
+class StoryRecord:
+    __slots__ = ("id", "ref", "subject", "status", "version", "tags")
+
+    def __init__(self, id, ref, subject, status, version, tags=()):
+        self.id = id
+        self.ref = ref
+        self.subject = subject
+        self.status = status
+        self.version = version
+        self.tags = tags
+
+    @classmethod
+    def from_json(cls, entry):
+        # Tags come as [name, color] pairs (or bare names on old projects)
+        tags = tuple(
+            (t[0], t[1]) if isinstance(t, (list, tuple)) else (t, None)
+            for t in entry.get("tags") or ()
+        )
+        return cls(entry["id"], entry.get("ref"), entry.get("subject") or "", entry.get("status"), entry.get("version"), tags)
+
+    def __repr__(self):
+        return f"StoryRecord(id={self.id}, ref={self.ref}, subject={self.subject!r})"
+
+
+def decode_stories(payload):
+    return [StoryRecord.from_json(entry) for entry in payload]
@@ -0,0 +1,159 @@
+import os
+import json
+import struct
+import threading
+from array import array
+from datetime import date, datetime
+import output as ot
+
+# Activity strike history.
+#
+# Every parsequota outcome is appended here as one fixed-width binary record, so the history
+# can be queried without touching Taiga. In memory the records are kept column by column in typed
+# arrays (one array per field) which keeps thousands of weeks of history down to a few hundred KB
+# and lets the /strikes aggregations run as straight passes over a couple of columns.
+#
+# Strings (board keys, quota and activity values) are dictionary encoded: the record only stores
+# a small integer code, the code -> string tables and story subjects live in a JSON sidecar.
+
+STRIKE_HISTORY_DIR = "strike_history" # Relative to the working directory of the bot
+RECORD = struct.Struct("<iiHHHbb") # story id, week (date ordinal), board, quota, activity, strike delta, strikes after
+
+
+class StrikeStore:
+    def __init__(self, path=STRIKE_HISTORY_DIR):
+        self.path = path
+        self.records_path = os.path.join(path, "records.bin")
+        self.meta_path = os.path.join(path, "meta.json")
+        self._lock = threading.Lock()
+
+        self.story = array("i")
+        self.week = array("i")
+        self.board = array("H")
+        self.quota = array("H")
+        self.activity = array("H")
+        self.delta = array("b")
+        self.strikes = array("b")
+
+        self.strings = [] # code -> string
+        self._codes = {} # string -> code
+        self.subjects = {} # story id -> card name
+        self.load()
+
+    def __len__(self):
+        return len(self.story)
+
+    def load(self):
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.strings = meta.get("strings", [])
+            self._codes = {s: i for i, s in enumerate(self.strings)}
+            self.subjects = {int(k): v for k, v in meta.get("subjects", {}).items()}
+
+        if os.path.exists(self.records_path):
+            with open(self.records_path, "rb") as f:
+                raw = f.read()
+            usable = len(raw) - len(raw) % RECORD.size # Drop a half written record left by a crash
+            for rec in RECORD.iter_unpack(raw[:usable]):
+                self._append_columns(*rec)
+            ot.info(f"Loaded {len(self)} activity strike records from '{self.path}'")
+
+    def _code(self, value):
+        value = str(value or "")
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            self.strings.append(value)
+            self._codes[value] = code
+        return code
+
+    def _append_columns(self, story, week, board, quota, activity, delta, strikes):
+        self.story.append(story)
+        self.week.append(week)
+        self.board.append(board)
+        self.quota.append(quota)
+        self.activity.append(activity)
+        self.delta.append(delta)
+        self.strikes.append(strikes)
+
+    def _save_meta(self):
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"strings": self.strings, "subjects": {str(k): v for k, v in self.subjects.items()}}, f)
+        os.replace(tmp, self.meta_path)
+
+    def append(self, board_key, story_id, subject, week, quota, activity, strikes_before, strikes_after):
+        if isinstance(week, (date, datetime)):
+            week = week.toordinal()
+        with self._lock:
+            known = len(self.strings), self.subjects.get(story_id)
+            rec = (int(story_id), int(week), self._code(board_key), self._code(quota), self._code(activity),
+                   int(strikes_after) - int(strikes_before), int(strikes_after))
+
+            os.makedirs(self.path, exist_ok=True)
+            self.subjects[int(story_id)] = subject
+            if known != (len(self.strings), subject):
+                # Codes are saved before the record that uses them, so a crash in between can't leave
+                # records pointing at codes meta.json doesn't have
+                self._save_meta()
+
+            with open(self.records_path, "ab") as f:
+                f.write(RECORD.pack(*rec))
+            self._append_columns(*rec)
+
+    # === Queries ===
+    # weeks is counted back from today, all queries are limited to one board
+
+    def _rows(self, board_key, weeks):
+        code = self._codes.get(board_key)
+        if code is None:
+            return []
+        cutoff = date.today().toordinal() - weeks * 7
+        board = self.board
+        week = self.week
+        # append fills the columns one at a time (strikes last) while parsequota runs in its thread, so
+        # only rows that are complete in every column are read
+        rows = len(self.strikes)
+        return [i for i in range(rows) if week[i] >= cutoff and board[i] == code]
+
+    def latest_levels(self, board_key, weeks):
+        # story id -> strikes after its most recent record in the window
+        latest = {}
+        story, week, strikes = self.story, self.week, self.strikes
+        for i in self._rows(board_key, weeks):
+            s = story[i]
+            prev = latest.get(s)
+            if prev is None or week[i] >= week[prev]:
+                latest[s] = i
+        return {s: strikes[i] for s, i in latest.items()}
+
+    def distribution(self, board_key, weeks, levels):
+        # levels is the number of strike levels (0 included), higher recorded levels count as the top one
+        counts = [0] * levels
+        for level in self.latest_levels(board_key, weeks).values():
+            counts[min(max(level, 0), levels - 1)] += 1
+        return counts
+
+    def trend(self, board_key, weeks):
+        # week -> [reviews, strikes given]
+        per_week = {}
+        week, delta = self.week, self.delta
+        for i in self._rows(board_key, weeks):
+            row = per_week.setdefault(week[i], [0, 0])
+            row[0] += 1
+            if delta[i] > 0:
+                row[1] += delta[i]
+        return [(date.fromordinal(w), *per_week[w]) for w in sorted(per_week)]
+
+    def at_risk(self, board_key, weeks, threshold):
+        # Stories that collected at least threshold strikes inside the window
+        gained = {}
+        story, delta = self.story, self.delta
+        for i in self._rows(board_key, weeks):
+            if delta[i] > 0:
+                gained[story[i]] = gained.get(story[i], 0) + delta[i]
+        levels = self.latest_levels(board_key, weeks)
+        risky = [(self.subjects.get(s, str(s)), g, levels.get(s, 0)) for s, g in gained.items() if g >= threshold]
+        risky.sort(key=lambda r: (-r[1], -r[2], r[0].lower()))
+        return risky
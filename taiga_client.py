@@ -0,0 +1,141 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from taiga import TaigaAPI
+import taiga.requestmaker
+from resilience import MAX_HEDGES, CircuitBreaker, LatencyTracker, hedged
+from singleflight import ReadCoalescer
+
+# Shared, authenticated Taiga client.
+#
+# Every board the bot works on goes through the same TaigaClient, so the process only logs in once
+# and every request (python-taiga's and our own raw PATCH/POST calls) reuses the same pool of
+# keep-alive connections instead of opening a new TLS connection per call.
+# Every request has a timeout and goes through the endpoint's circuit breaker (see resilience.py),
+# duplicate reads are coalesced (see singleflight.py).
+
+TAIGA_HOST = "https://api.taiga.io"
+TAIGA_URL = TAIGA_HOST + "/api/v1" #Constant, don't change, essential for JSON functions
+POOL_SIZE = 16 # Max keep-alive connections kept open to Taiga, should be >= the number of boards working at once
+
+
+CONNECT_TIMEOUT = 5 # Seconds to open a connection to Taiga
+READ_TIMEOUT = 20 # Seconds to wait for Taiga to answer once connected
+HEDGE_WORKERS = 32 # Threads running hedged reads, more than the threads that send reads at once (commands + worker pools) plus MAX_HEDGES
+
+
+def endpoint_key(method, url):
+    # "GET https://api.taiga.io/api/v1/userstories/123?x=1" -> "GET userstories/{id}"
+    path = urlsplit(url).path
+    if path.startswith("/api/v1/"):
+        path = path[len("/api/v1/"):]
+    parts = ["{id}" if p.isdigit() else p for p in path.strip("/").split("/")]
+    return f"{method} {'/'.join(parts)}"
+
+
+class _PooledRequests:
+    # python-taiga calls requests.get/post/... directly, which opens a fresh connection every time.
+    # This stands in for the requests module inside taiga.requestmaker and sends those calls through our client.
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        if name in ("get", "post", "put", "patch", "delete"):
+            return partial(self._client.request, name.upper())
+        return getattr(requests, name)
+
+
+class TaigaClient:
+    def __init__(self, email, password, pool_size=POOL_SIZE, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), hedge_reads=True):
+        self.timeout = timeout
+        self.hedge_reads = hedge_reads
+        self.breakers = {}
+        self.latencies = {}
+        self._hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="taiga-hedge")
+        self._hedge_slots = threading.Semaphore(MAX_HEDGES)
+        self.reads = ReadCoalescer()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        taiga.requestmaker.requests = _PooledRequests(self)
+
+        self.api = TaigaAPI(host=TAIGA_HOST)
+        self.api.auth(
+            username=email,
+            password=password
+        )
+
+    def degraded(self):
+        # Endpoints currently failing fast
+        return [name for name, breaker in self.breakers.items() if breaker.state == "open"]
+
+    def read_scope(self):
+        # with client.read_scope(): repeated identical reads in this thread hit Taiga once (see singleflight.py)
+        return self.reads.scope()
+
+    def request(self, method, url, **kwargs):
+        if method == "GET":
+            return self.reads.read(url, kwargs, partial(self._send, method, url, **kwargs))
+        try:
+            return self._send(method, url, **kwargs)
+        finally:
+            self.reads.wrote(url)
+
+    def _send(self, method, url, **kwargs):
+        endpoint = endpoint_key(method, url)
+        breaker = self.breakers.get(endpoint) or self.breakers.setdefault(endpoint, CircuitBreaker(endpoint))
+        latency = self.latencies.get(endpoint) or self.latencies.setdefault(endpoint, LatencyTracker())
+        breaker.allow()
+        kwargs.setdefault("timeout", self.timeout)
+
+        def send():
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException:
+                breaker.record_failure()
+                raise
+            if response.status_code >= 500 or response.status_code == 429:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+                latency.add(time.monotonic() - started)
+            return response
+
+        # Only reads are safe to send twice
+        if method == "GET" and self.hedge_reads:
+            delay = latency.hedge_delay()
+            if delay is not None:
+                return hedged(send, delay, self._hedge_pool, self._hedge_slots)
+        return send()
+
+    def headers(self):
+        return {
+            "Authorization": f"Bearer {self.api.token}",
+            "Content-Type": "application/json"
+        }
+
+    def url(self, path):
+        return f"{TAIGA_URL}/{path.lstrip('/')}"
+
+    def get(self, path, params=None, paginate=True):
+        headers = self.headers()
+        if not paginate:
+            headers["x-disable-pagination"] = "True"
+        return self.request("GET", self.url(path), headers=headers, params=params or {})
+
+    def post(self, path, data):
+        return self.request("POST", self.url(path), headers=self.headers(), data=json.dumps(data))
+
+    def patch(self, path, data):
+        return self.request("PATCH", self.url(path), headers=self.headers(), data=json.dumps(data))
+
+    def delete(self, path):
+        return self.request("DELETE", self.url(path), headers=self.headers())